@@ -1,10 +1,24 @@
+import html
+import inspect
+import io
 import streamlit as st
-import re
-import pandas as pd
 from collections import Counter
 from datetime import datetime
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from youtube_analyzer.analysis import ANALYSIS_CACHE, get_analysis
+from youtube_analyzer.cache import get_video_cache
+from youtube_analyzer.diagnostics import Recorder, recording, timed, to_json, to_prometheus
+from youtube_analyzer.export import EXPORT_FORMATS, export_report
+from youtube_analyzer.frequency import FREQUENCY_CACHE, create_word_frequency_df
+from youtube_analyzer.highlight import HTML_CACHE
+from youtube_analyzer.history import get_view_history
+from youtube_analyzer.memo import memo_stats
+from youtube_analyzer.phrases import create_phrase_frequency_df, mine_phrases
+from youtube_analyzer.quota import DEFAULT_DAILY_BUDGET, DEFAULT_RUN_BUDGET, QuotaScheduler
+from youtube_analyzer.refresh import DEFAULT_CYCLE_BUDGET, DEFAULT_PERIOD, get_stats_refresher
+from youtube_analyzer.similarity import DEFAULT_CLUSTER_THRESHOLD, get_similarity
+from youtube_analyzer.store import VideoStore
+from youtube_analyzer.sources import DEFAULT_MAX_VIDEOS, expand_sources, get_playlist_checkpoints, url_lines
+from youtube_analyzer.videos import MAX_IDS_PER_REQUEST, batched, get_video_details
 
 st.set_page_config(
     page_title="YouTube Video Analyzer",
@@ -13,185 +27,344 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Function to extract video ID from YouTube URL
-def extract_video_id(url):
-    # Regular expressions to match different YouTube URL formats
-    patterns = [
-        r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-        r'(?:embed\/)([0-9A-Za-z_-]{11})',
-        r'(?:shorts\/)([0-9A-Za-z_-]{11})',
-        r'(?:youtu\.be\/)([0-9A-Za-z_-]{11})'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
-
-# Function to get video details from YouTube API
-def get_video_details(api_key, video_ids):
-    youtube = build('youtube', 'v3', developerKey=api_key)
-    
-    videos_data = []
-    
-    try:
-        # Get video details for each video ID
-        for video_id in video_ids:
-            # Get video info
-            video_response = youtube.videos().list(
-                part='snippet,statistics',
-                id=video_id
-            ).execute()
-            
-            if 'items' in video_response and len(video_response['items']) > 0:
-                video_item = video_response['items'][0]
-                snippet = video_item['snippet']
-                statistics = video_item['statistics']
-                
-                # Extract relevant information
-                video_data = {
-                    'id': video_id,
-                    'title': snippet.get('title', ''),
-                    'description': snippet.get('description', ''),
-                    'tags': snippet.get('tags', []),
-                    'thumbnail': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
-                    'view_count': int(statistics.get('viewCount', 0)),
-                    'published_at': snippet.get('publishedAt', '')
+# Word frequency table of one analyzed field, built once per analysis and
+# shared by every rerun and session showing it
+def get_frequency_df(analysis_key, field, field_analysis, total_videos):
+    return FREQUENCY_CACHE.get_or_compute(
+        (analysis_key, field),
+        lambda: create_word_frequency_df(
+            field_analysis['word_count'], total_videos, url_lists=field_analysis.get('url_lists')
+        )
+    )
+
+# Analysis shown in this session
+#
+# The session only keeps its videos and the analysis key; the analysis
+# itself lives in the shared, bounded cache and is rebuilt from the videos
+# (with cached tokens) if it was evicted.
+def get_session_analysis():
+    analysis_key = st.session_state.analysis_key
+    state = ANALYSIS_CACHE.get(analysis_key)
+    if state is None:
+        analysis_key, state = get_analysis(st.session_state.videos_data)
+        st.session_state.analysis_key = analysis_key
+    return analysis_key, state.results()
+
+# Page sizes offered for the Individual Video Details section
+DETAILS_PAGE_SIZES = [10, 25, 50, 100]
+
+# Recent Streamlit versions can run an expander's content only while it is
+# open; older ones always run it
+LAZY_EXPANDERS = 'on_change' in inspect.signature(st.expander).parameters
+
+# Expander whose content is only computed while it is open, see expander_is_open
+def lazy_expander(label, key):
+    if LAZY_EXPANDERS:
+        return st.expander(label, key=key, on_change="rerun")
+    return st.expander(label)
+
+def expander_is_open(expander):
+    # Without state tracking the content is always rendered
+    return getattr(expander, 'open', None) is not False
+
+# Phrases shared by the videos' titles or descriptions, in an expander
+# that mines them once per analysis, the first time it is opened
+def render_phrase_table(analysis_key, field, text_key, analysis_results, videos_data):
+    phrases_expander = lazy_expander("Common Phrases", key=f"{field}_phrases")
+    if not expander_is_open(phrases_expander):
+        return
+    phrase_df = FREQUENCY_CACHE.get_or_compute(
+        (analysis_key, field, 'phrases'),
+        lambda: create_phrase_frequency_df(
+            mine_phrases([[text] for text in videos_data.texts(text_key)]),
+            analysis_results[field]['word_count'], len(videos_data)
+        )
+    )
+    if phrase_df.empty:
+        phrases_expander.info("No common phrases found.")
+    else:
+        phrases_expander.dataframe(phrase_df, height=300)
+
+# Report formats offered for download, by label
+REPORT_FORMATS = {"Excel": 'xlsx', "CSV": 'csv', "Parquet": 'parquet'}
+
+# Recent Streamlit versions build a download's data only when it is clicked
+DEFERRED_DOWNLOADS = 'callable' in (inspect.getdoc(st.download_button) or '')
+
+# Download button for the report of the current analysis
+def render_report_download(analysis_key, videos_data, analysis_results):
+    label = st.radio("Report format", list(REPORT_FORMATS), horizontal=True, key="report_format")
+    output_format = REPORT_FORMATS[label]
+    extension, mime = EXPORT_FORMATS[output_format]
+
+    def data():
+        return export_report(analysis_key, output_format, videos_data, analysis_results)
+
+    st.download_button(
+        "Download excel file with recommendations" if output_format == 'xlsx' else f"Download {label} report",
+        data=data if DEFERRED_DOWNLOADS else data(),
+        file_name=f"youtube_analysis.{extension}",
+        mime=mime
+    )
+
+# Sidebar panel saving the analyzed videos as a Parquet snapshot and opening
+# one, which shows its analysis without fetching the videos again
+def render_snapshot_panel():
+    with st.expander("Snapshots"):
+        if 'videos_data' in st.session_state:
+            videos_data = st.session_state.videos_data
+
+            def data():
+                buffer = io.BytesIO()
+                videos_data.save_parquet(buffer)
+                return buffer.getvalue()
+
+            st.download_button(
+                "Save snapshot",
+                data=data if DEFERRED_DOWNLOADS else data(),
+                file_name="youtube_videos.parquet",
+                mime="application/vnd.apache.parquet"
+            )
+
+        uploaded = st.file_uploader("Open snapshot", type=['parquet'], key="snapshot_file")
+        # A file stays selected across reruns and is opened once
+        if uploaded is None or st.session_state.get('snapshot_opened') == uploaded.file_id:
+            return
+        st.session_state.snapshot_opened = uploaded.file_id
+        try:
+            videos_data = VideoStore.load_parquet(uploaded)
+        except Exception as e:
+            st.error(f"Could not open the snapshot: {e}")
+            return
+        if not len(videos_data):
+            st.warning("The snapshot has no videos.")
+            return
+        st.session_state.videos_data = videos_data
+        st.session_state.analysis_key = get_analysis(videos_data)[0]
+        st.success(f"Opened a snapshot of {len(videos_data)} videos.")
+
+# Start tracking the videos of this session once tracking is turned on
+def track_session_videos():
+    if st.session_state.view_tracking and 'videos_data' in st.session_state:
+        get_view_history().track(st.session_state.videos_data)
+
+# Background polling of the view counts of analyzed videos
+#
+# The refresher is shared by every session using the same API key; while
+# it runs, the videos of each analysis are tracked and their velocity is
+# shown with their details.
+def render_refresh_panel(api_key, daily_budget):
+    with st.expander("View tracking"):
+        tracking = st.checkbox(
+            "Track view counts in the background", key="view_tracking", on_change=track_session_videos
+        )
+        cycle_budget = st.number_input(
+            "Quota units per refresh", min_value=1, value=DEFAULT_CYCLE_BUDGET, step=10,
+            help="Each unit polls the view counts of 50 videos"
+        )
+        minutes = st.number_input("Minutes between refreshes", min_value=1, value=DEFAULT_PERIOD // 60, step=5)
+
+        history_stats = get_view_history().stats()
+        st.caption(
+            f"{history_stats['tracked']} videos tracked, {history_stats['due']} due, "
+            f"{history_stats['observations']} observations ({history_stats['delta_bytes'] / 1024:.1f} KB)"
+        )
+        if not api_key:
+            if tracking:
+                st.info("Enter an API key to refresh view counts.")
+            return
+
+        refresher = get_stats_refresher(api_key)
+        refresher.cycle_budget = cycle_budget
+        refresher.daily_budget = daily_budget
+        refresher.period = minutes * 60
+        if tracking:
+            refresher.start()
+        elif refresher.running:
+            refresher.stop()
+
+        result = refresher.last_result
+        if result is not None:
+            if 'refreshed' in result:
+                st.caption(
+                    f"Last refresh at {datetime.fromtimestamp(result['at']):%H:%M}: "
+                    f"{result['refreshed']} of {result['due']} due videos, {result['units']} quota units"
+                )
+            for error in result['errors']:
+                st.warning(error)
+
+# Views of a tracked video over time, indexed by observation time
+def view_history_df(video_id):
+    import pandas as pd
+
+    points = get_view_history().series(video_id)
+    return pd.DataFrame(
+        {'Views': [views for _, views in points]},
+        index=pd.to_datetime([at for at, _ in points], unit='s')
+    )
+
+# Invalid URLs listed by name in the summary after an analysis
+INVALID_URLS_SHOWN = 10
+
+# One summarized warning listing the URLs that could not be parsed
+def report_invalid_urls(invalid_urls):
+    if not invalid_urls:
+        return
+    shown = ", ".join(invalid_urls[:INVALID_URLS_SHOWN])
+    more = len(invalid_urls) - INVALID_URLS_SHOWN
+    st.warning(
+        f"Could not extract a video, playlist or channel from {len(invalid_urls)} URLs: {shown}"
+        + (f" and {more} more" if more > 0 else "")
+    )
+
+# Show the details page containing the video at `position` (0-based)
+def jump_to_video(position):
+    st.session_state.details_page = position // st.session_state.details_page_size + 1
+    st.session_state.details_focus = position
+
+# Timings of this session's runs, recorded while enabled in the Diagnostics
+# panel; the last run and the last analysis are kept. A cProfile capture is
+# taken of one analysis when requested.
+def run_with_diagnostics(app):
+    # Button state is known before the script reaches the button
+    analyzing = st.session_state.get('analyze_clicked', False)
+    profile = analyzing and st.session_state.get('diagnostics_profile', False)
+    if profile:
+        st.session_state.diagnostics_profile = False
+    if not st.session_state.get('diagnostics_enabled', False) and not profile:
+        app()
+        return
+
+    recorder = Recorder(profile=profile)
+    with recording(recorder):
+        app()
+    snapshot = recorder.snapshot()
+    st.session_state.diagnostics_last_run = snapshot
+    if analyzing:
+        st.session_state.diagnostics_last_analysis = snapshot
+
+# Sidebar panel with the stage timings, API usage and cache hits of a recorded run
+def render_diagnostics_panel():
+    with st.expander("Diagnostics"):
+        st.checkbox("Record timings", key="diagnostics_enabled")
+        st.checkbox("Profile the next analysis (cProfile)", key="diagnostics_profile")
+
+        runs = {
+            label: st.session_state[key]
+            for label, key in (("Last analysis", 'diagnostics_last_analysis'), ("Last rerun", 'diagnostics_last_run'))
+            if key in st.session_state
+        }
+        if not runs:
+            st.caption("No run recorded yet.")
+            return
+        snapshot = runs[st.radio("Run", list(runs), horizontal=True, key="diagnostics_run")]
+
+        st.caption(f"Wall time: {snapshot['wall_seconds'] * 1000:,.0f} ms")
+        if snapshot['stages']:
+            st.table([
+                {
+                    'Stage': name,
+                    'Calls': stats['calls'],
+                    'Total ms': round(stats['seconds'] * 1000, 1),
+                    'Mean ms': round(stats['seconds'] * 1000 / stats['calls'], 2)
                 }
-                
-                videos_data.append(video_data)
-                
-    except HttpError as e:
-        st.error(f"An error occurred: {e}")
-        
-    return videos_data
+                for name, stats in sorted(snapshot['stages'].items(), key=lambda item: -item[1]['seconds'])
+            ])
+        counters = snapshot['counters']
+        st.caption(
+            f"API: {counters.get('api_calls', 0)} calls, {counters.get('api_units', 0)} units, "
+            f"{counters.get('api_bytes_received', 0) / 1024:,.1f} KiB received, "
+            f"{counters.get('api_not_modified', 0)} not modified"
+        )
+        st.caption(
+            f"Video cache: {counters.get('video_cache_hits', 0)} hits, {counters.get('video_cache_misses', 0)} misses"
+        )
+        st.caption("Memo hits: " + ", ".join(
+            f"{name} {stats['hits']}/{stats['hits'] + stats['misses']}" for name, stats in snapshot['memo'].items()
+        ))
 
-# Function to tokenize text and remove common stop words
-def tokenize_text(text):
-    # First, detect and completely remove URLs using comprehensive pattern
-    # This removes the entire URL without breaking it into separate words
-    url_pattern = r'(https?:\/\/)?(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)'
-    
-    # For storing all original URLs to make sure they're completely removed
-    urls_in_text = re.findall(url_pattern, text, flags=re.IGNORECASE)
-    
-    # Remove all URLs completely
-    text_without_urls = re.sub(url_pattern, ' ', text, flags=re.IGNORECASE)
-    
-    # Convert to lowercase
-    text = text_without_urls.lower()
-    
-    # Word normalization for hyphenated/non-hyphenated variants
-    word_variants = {
-        'lo-fi': 'lofi',
-        'lo fi': 'lofi',
-        'hip-hop': 'hiphop',
-        'hip hop': 'hiphop',
-        'r&b': 'rnb',
-        'r & b': 'rnb'
-    }
-    
-    # Apply word variant normalization
-    for variant, normalized in word_variants.items():
-        text = text.replace(variant, normalized)
-    
-    # Common multi-word phrases to preserve as single tokens
-    multi_word_phrases = ["hiphop", "lofi beats", "chill mix", "study music", 
-                         "relaxing music", "sleep music", "ambient music", 
-                         "background music", "piano music", "jazz music", 
-                         "lofi chill", "chill out", "deep house"]
-    
-    # Replace spaces in multi-word phrases with underscores
-    for phrase in multi_word_phrases:
-        if phrase in text:
-            text = text.replace(phrase, phrase.replace(' ', '_'))
-    
-    # Find words including hyphenated terms
-    # This regex matches both regular words and hyphenated words
-    words = re.findall(r'\b[\w\-]+\b', text)
-    
-    # Normalize hyphenated words by removing hyphens
-    normalized_words = []
-    for word in words:
-        # Replace hyphens with empty string to normalize
-        normalized_word = word.replace('-', '')
-        normalized_words.append(normalized_word)
-    
-    # Common stop words to filter out
-    stop_words = {
-        'a', 'an', 'the', 'and', 'or', 'but', 'if', 'because', 'as', 'what',
-        'when', 'where', 'how', 'why', 'which', 'who', 'whom', 'this', 'that',
-        'these', 'those', 'in', 'on', 'at', 'by', 'for', 'with', 'about',
-        'against', 'between', 'into', 'through', 'during', 'before', 'after',
-        'above', 'below', 'to', 'from', 'up', 'down', 'is', 'am', 'are',
-        'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having',
-        'do', 'does', 'did', 'doing', 'i', 'you', 'he', 'she', 'it', 'we', 'they',
-        'me', 'him', 'her', 'us', 'them', 'my', 'your', 'his', 'its', 'our', 'their',
-        'can', 'could', 'will', 'would', 'shall', 'should', 'may', 'might', 'must'
-    }
-    
-    # Filter out stop words and short words
-    filtered_words = [word.replace('_', ' ') if '_' in word else word 
-                     for word in normalized_words if word not in stop_words and len(word) > 2]
-    
-    return filtered_words
-
-# Function to analyze common and unique words
-def analyze_words(videos_data):
-    # Initialize dictionaries to store words from each video
-    title_words_per_video = {}
-    tag_words_per_video = {}
-    desc_words_per_video = {}
-    
-    # Process each video
-    for video in videos_data:
-        video_id = video['id']
-        
-        # Process title
-        title_words = tokenize_text(video['title'])
-        title_words_per_video[video_id] = title_words
-        
-        # Process tags (tags are already in a list)
-        tag_words_per_video[video_id] = [tag.lower() for tag in video.get('tags', [])]
-        
-        # Process description
-        desc_words = tokenize_text(video['description'])
-        desc_words_per_video[video_id] = desc_words
-    
-    # Count word occurrences across videos
-    title_word_count = count_words_across_videos(title_words_per_video)
-    tag_word_count = count_words_across_videos(tag_words_per_video)
-    desc_word_count = count_words_across_videos(desc_words_per_video)
-    
-    return {
-        'title_analysis': {
-            'words_per_video': title_words_per_video,
-            'word_count': title_word_count
-        },
-        'tag_analysis': {
-            'words_per_video': tag_words_per_video,
-            'word_count': tag_word_count
-        },
-        'desc_analysis': {
-            'words_per_video': desc_words_per_video,
-            'word_count': desc_word_count
-        },
-    }
-
-# Count how many videos contain each word
-def count_words_across_videos(words_per_video):
-    all_videos = set(words_per_video.keys())
-    word_count = {}
-    
-    for video_id, words in words_per_video.items():
-        for word in set(words):  # Use set to count each word once per video
-            if word not in word_count:
-                word_count[word] = set()
-            word_count[word].add(video_id)
-    
-    # Convert sets to counts
-    return {word: (len(videos), list(videos)) for word, videos in word_count.items()}
+        json_col, prometheus_col = st.columns(2)
+        with json_col:
+            st.download_button("JSON", to_json(snapshot), file_name="diagnostics.json", mime="application/json")
+        with prometheus_col:
+            st.download_button("Prometheus", to_prometheus(snapshot), file_name="diagnostics.prom", mime="text/plain")
+
+        if snapshot['profile']:
+            st.code(snapshot['profile'], language=None)
+
+# Frequency table whose selected row offers a jump to the videos containing the word
+@timed('render_frequency_table')
+def render_frequency_table(df, field, field_analysis, videos_data):
+    event = st.dataframe(df, height=300, key=f"{field}_table", on_select="rerun", selection_mode="single-row")
+    rows = event.selection.rows if event is not None else []
+    if not rows:
+        st.caption("Select a row to jump to the videos containing that word.")
+        return
+
+    word = df['Word'].iloc[rows[0]]
+    index = field_analysis['word_count']
+    positions = [index.video_positions[video_id] for video_id in index.videos_containing(word)]
+    st.selectbox(
+        f"Jump to a video with \"{word}\"",
+        positions,
+        index=None,
+        format_func=lambda pos: f"Video {pos + 1}: {videos_data.columns['title'][pos]}",
+        key=f"{field}_jump",
+        on_change=lambda: jump_to_video(st.session_state[f"{field}_jump"])
+    )
+
+# Videos most alike a chosen one by the words of their titles, tags and
+# descriptions, and optionally groups of alike videos
+@timed('render_similarity')
+def render_similarity_tab(analysis_key, analysis_results, videos_data):
+    st.subheader("Most Similar Videos")
+    if len(videos_data) < 2:
+        st.info("At least two videos are needed to compare them.")
+        return
+
+    similarity = get_similarity(analysis_key, analysis_results)
+    titles = videos_data.columns['title']
+
+    def label(pos):
+        return f"Video {pos + 1}: {titles[pos]}"
+
+    position = st.selectbox("Video", range(len(videos_data)), format_func=label, key="similarity_video")
+    rows = [
+        {
+            'Video': label(neighbour),
+            'Similarity': f"{score:.0%}",
+            'Link': f"https://www.youtube.com/watch?v={videos_data.video_ids[neighbour]}"
+        }
+        for neighbour, score in zip(similarity.neighbours[position], similarity.scores[position])
+        if neighbour >= 0
+    ]
+    if rows:
+        st.dataframe(rows, height=300)
+    else:
+        st.info("No other video shares words with this one.")
+
+    if not st.checkbox("Group similar videos", key="similarity_clusters"):
+        return
+    threshold = st.slider(
+        "Minimum similarity within a group", min_value=0.05, max_value=0.95,
+        value=DEFAULT_CLUSTER_THRESHOLD, step=0.05, key="similarity_threshold"
+    )
+    clusters = similarity.clusters(threshold)
+    members = {}
+    for pos, cluster in enumerate(clusters):
+        if cluster >= 0:
+            members.setdefault(int(cluster), []).append(pos)
+    if not members:
+        st.info("No videos are this similar to each other.")
+        return
+    st.dataframe(
+        [
+            {'Group': cluster + 1, 'Videos': len(positions), 'Titles': "; ".join(label(pos) for pos in positions)}
+            for cluster, positions in sorted(members.items())
+        ],
+        height=300
+    )
+    st.caption(f"{int((clusters < 0).sum())} videos are in no group.")
 
 # Format datetime string to human-readable format
 def format_datetime(datetime_str):
@@ -210,9 +383,18 @@ def main():
         st.markdown("---")
         st.info("This app analyzes multiple YouTube videos and finds common elements between them.")
         st.markdown("1. Enter your YouTube API key")
-        st.markdown("2. Add YouTube video URLs")
+        st.markdown("2. Add YouTube video, playlist or channel URLs")
         st.markdown("3. Click 'Analyze Videos' to see results")
 
+        # Quota budgets for the shared API key
+        with st.expander("Quota settings"):
+            run_budget = st.number_input("Quota units per run", min_value=1, value=DEFAULT_RUN_BUDGET, step=100)
+            daily_budget = st.number_input("Quota units per day", min_value=1, value=DEFAULT_DAILY_BUDGET, step=1000)
+
+        # Playlists and channels are expanded into their videos
+        with st.expander("Playlists and channels"):
+            max_videos = st.number_input("Videos per playlist or channel", min_value=1, value=DEFAULT_MAX_VIDEOS, step=50)
+
     # Main content
     st.title("🎬 YouTube Video Comparison Tool")
     
@@ -261,94 +443,216 @@ def main():
                 else:
                     st.button("❌ Delete", key=f"delete_video_{i}", on_click=remove_url_field)
     
+    # Long URL lists are pasted or uploaded, one URL per line
+    with st.expander("Paste or upload many URLs"):
+        st.text_area("URLs, one per line", key="bulk_urls", height=150)
+        urls_file = st.file_uploader("Text file with one URL per line", type=['txt', 'csv'], key="urls_file")
+
     # Analyze button
-    analyze_clicked = st.button("Analyze Videos", type="primary")
+    analyze_clicked = st.button("Analyze Videos", type="primary", key="analyze_clicked")
     
     # Process videos when button is clicked
     if analyze_clicked:
         if not api_key:
             st.error("Please enter your YouTube API key in the sidebar.")
         else:
-            # Filter out empty URLs
-            valid_urls = [url for url in st.session_state.video_urls if url.strip()]
+            # Filter out empty URLs; repeated lines are only parsed once
+            valid_urls = [url.strip() for url in st.session_state.video_urls if url.strip()]
+            valid_urls += url_lines(st.session_state.get('bulk_urls', ''))
+            if urls_file is not None:
+                valid_urls += url_lines(urls_file.getvalue().decode('utf-8', errors='replace'))
+            valid_urls = list(dict.fromkeys(valid_urls))
             
             if not valid_urls:
                 st.warning("Please add at least one YouTube video URL.")
             else:
                 with st.spinner("Analyzing videos..."):
-                    # Extract video IDs
-                    video_ids = []
-                    for url in valid_urls:
-                        video_id = extract_video_id(url.strip())
-                        if video_id:
-                            video_ids.append(video_id)
-                        else:
-                            st.warning(f"Could not extract video ID from URL: {url}")
-                    
-                    if video_ids:
-                        # Get video details
-                        videos_data = get_video_details(api_key, video_ids)
-                        
+                    scheduler = QuotaScheduler(run_budget=run_budget, daily_budget=daily_budget)
+
+                    # The last analysis is updated: only videos that are not
+                    # analyzed yet are fetched and tokenized
+                    base_analysis = None
+                    if 'analysis_key' in st.session_state:
+                        base_analysis = ANALYSIS_CACHE.get(st.session_state.analysis_key)
+                    known_videos = st.session_state.get('videos_data') or VideoStore.from_videos([])
+
+                    # Video IDs stream in as playlist and channel pages are
+                    # listed and are fetched a few chunks at a time
+                    invalid_urls = []
+                    video_ids = expand_sources(
+                        valid_urls, api_key, scheduler,
+                        max_videos=max_videos,
+                        on_invalid=invalid_urls.append,
+                        on_error=lambda url, message: st.error(f"Could not list the videos of {url}: {message}")
+                    )
+                    requested_ids = []
+
+                    def new_video_ids():
+                        for video_id in video_ids:
+                            requested_ids.append(video_id)
+                            if video_id not in known_videos.video_positions:
+                                yield video_id
+
+                    progress = st.empty()
+                    fetched = {}
+                    details = {'missing_ids': [], 'failed_ids': [], 'errors': []}
+                    new_count = 0
+
+                    for batch in batched(new_video_ids(), MAX_IDS_PER_REQUEST * 4):
+                        new_count += len(batch)
+                        batch_details = get_video_details(api_key, batch, scheduler=scheduler)
+                        fetched.update((video['id'], video) for video in batch_details['videos'])
+                        for key in details:
+                            details[key].extend(batch_details[key])
+                        progress.caption(f"Fetched {len(fetched)} of {new_count} new videos listed so far...")
+                    progress.empty()
+                    st.session_state.quota_stats = scheduler.stats()
+                    report_invalid_urls(invalid_urls)
+
+                    videos_data = VideoStore.from_videos(
+                        known_videos.get(video_id) or fetched[video_id]
+                        for video_id in requested_ids
+                        if video_id in known_videos.video_positions or video_id in fetched
+                    )
+
+                    if requested_ids:
+                        # Partial results are kept; failed videos are listed once
+                        for error in dict.fromkeys(details['errors']):
+                            st.error(error)
+                        if details['failed_ids']:
+                            st.warning(
+                                f"Could not fetch {len(details['failed_ids'])} videos: "
+                                + ", ".join(details['failed_ids'])
+                            )
+
+                        # Report videos that are private, deleted or never existed
+                        if details['missing_ids']:
+                            st.warning(
+                                "Could not find these videos (private, deleted or invalid ID): "
+                                + ", ".join(details['missing_ids'])
+                            )
+
                         if videos_data:
                             # Store in session state for later use
+                            st.session_state.analysis_key = get_analysis(videos_data, base_analysis)[0]
                             st.session_state.videos_data = videos_data
-                            st.session_state.analysis_results = analyze_words(videos_data)
+                            if st.session_state.get('view_tracking'):
+                                get_view_history().track(videos_data)
                             st.success(f"Successfully analyzed {len(videos_data)} videos!")
                         else:
                             st.error("Failed to retrieve video data. Please check your API key and try again.")
                     else:
                         st.error("No valid YouTube video IDs found in the provided URLs.")
-    
+
+    # Metadata cache statistics
+    with st.sidebar:
+        cache_stats = get_video_cache().stats()
+        st.markdown("---")
+        st.caption(
+            f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['stale']} refreshed, {cache_stats['not_modified']} not modified "
+            f"({cache_stats['hit_rate']:.0%} hit rate)"
+        )
+        if st.button("Clear cache"):
+            get_video_cache().clear()
+            get_playlist_checkpoints().clear()
+
+        # In-memory caches shared by all sessions of the server process
+        st.caption("Memo: " + ", ".join(
+            f"{name} {stats['hit_rate']:.0%} hits ({stats['entries']} entries)"
+            for name, stats in memo_stats().items()
+        ))
+
+        render_snapshot_panel()
+        render_refresh_panel(api_key, daily_budget)
+        render_diagnostics_panel()
+
+        # Quota usage and throttling of the last run
+        if 'quota_stats' in st.session_state:
+            quota_stats = st.session_state.quota_stats
+            st.caption(
+                f"Quota: {quota_stats['units_used']} units used in the last run, "
+                f"{quota_stats['run_remaining']} left in run budget, "
+                f"{quota_stats['daily_remaining']} left today"
+            )
+            st.caption(
+                f"Throttling: {quota_stats['retries']} retries "
+                f"({quota_stats['throttled']} rate-limited), "
+                f"{quota_stats['backoff_seconds']:.1f}s backoff"
+            )
+
     # Display analysis if data is available
-    if 'videos_data' in st.session_state and 'analysis_results' in st.session_state:
+    if 'videos_data' in st.session_state and 'analysis_key' in st.session_state:
         videos_data = st.session_state.videos_data
-        analysis_results = st.session_state.analysis_results
+        analysis_key, analysis_results = get_session_analysis()
         total_videos = len(videos_data)
         
         st.markdown("---")
         st.subheader("🔍 Analysis Results")
         
         # Create tabs for the different analysis sections
-        tab1, tab2, tab3 = st.tabs(["Titles", "Tags", "Descriptions"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Titles", "Tags", "Descriptions", "Similar Videos"])
         
         with tab1:
             st.subheader("Common Words in Titles")
-            title_df = create_word_frequency_df(
-                analysis_results['title_analysis']['word_count'], 
-                total_videos
-            )
+            title_df = get_frequency_df(analysis_key, 'title_analysis', analysis_results['title_analysis'], total_videos)
             if not title_df.empty:
-                st.dataframe(title_df, height=300)
+                render_frequency_table(title_df, 'title_analysis', analysis_results['title_analysis'], videos_data)
             else:
                 st.info("No common words found in titles.")
+            render_phrase_table(analysis_key, 'title_analysis', 'title', analysis_results, videos_data)
         
         with tab2:
             st.subheader("Common Tags")
-            tag_df = create_word_frequency_df(
-                analysis_results['tag_analysis']['word_count'],
-                total_videos
-            )
+            tag_df = get_frequency_df(analysis_key, 'tag_analysis', analysis_results['tag_analysis'], total_videos)
             if not tag_df.empty:
-                st.dataframe(tag_df, height=300)
+                render_frequency_table(tag_df, 'tag_analysis', analysis_results['tag_analysis'], videos_data)
             else:
                 st.info("No common tags found.")
         
         with tab3:
             st.subheader("Common Words in Descriptions")
-            desc_df = create_word_frequency_df(
-                analysis_results['desc_analysis']['word_count'],
-                total_videos
-            )
+            desc_df = get_frequency_df(analysis_key, 'desc_analysis', analysis_results['desc_analysis'], total_videos)
             if not desc_df.empty:
-                st.dataframe(desc_df, height=300)
+                render_frequency_table(desc_df, 'desc_analysis', analysis_results['desc_analysis'], videos_data)
             else:
                 st.info("No common words found in descriptions.")
+            render_phrase_table(analysis_key, 'desc_analysis', 'description', analysis_results, videos_data)
+
+        with tab4:
+            render_similarity_tab(analysis_key, analysis_results, videos_data)
+
+        render_report_download(analysis_key, videos_data, analysis_results)
         
-        # Individual video details
+        # Individual video details, one page at a time
         st.markdown("---")
         st.subheader("📽️ Individual Video Details")
-        
-        for i, video in enumerate(videos_data):
+
+        if 'details_page_size' not in st.session_state:
+            st.session_state.details_page_size = DETAILS_PAGE_SIZES[0]
+        page_size = st.session_state.details_page_size
+        page_count = max(1, -(-total_videos // page_size))
+        # A smaller analysis or a larger page size can leave the page out of range
+        st.session_state.details_page = min(st.session_state.get('details_page', 1), page_count)
+
+        size_col, page_col = st.columns([1, 1])
+        with size_col:
+            st.selectbox("Videos per page", DETAILS_PAGE_SIZES, key="details_page_size")
+        with page_col:
+            page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, key="details_page")
+
+        start = (page - 1) * page_size
+        page_videos = videos_data[start:start + page_size]
+        # Views per hour of the tracked videos on this page
+        velocities = get_view_history().velocities(video['id'] for video in page_videos)
+        st.caption(f"Showing videos {start + 1}-{start + len(page_videos)} of {total_videos}")
+
+        # Link to the video picked in a frequency table, now on this page
+        focus = st.session_state.pop('details_focus', None)
+        if focus is not None and start <= focus < start + page_size:
+            st.markdown(f"[↓ Go to Video {focus + 1}](#video-{focus + 1})")
+
+        for i, video in enumerate(page_videos, start=start):
             # Create a container for each video
             video_container = st.container()
             
@@ -356,12 +660,14 @@ def main():
                 # Add HTML anchor for navigation from tables
                 st.markdown(f"<div id='video-{i+1}'></div>", unsafe_allow_html=True)
                 
-                # Create highlighted title with common words in green
-                highlighted_title = render_highlighted_text_inline(
-                    video['title'],
-                    analysis_results['title_analysis']['word_count'],
-                    video['id'],
-                    videos_data
+                # Create highlighted title with common words in green;
+                # fragments are cached per analysis and video across reruns
+                highlighted_title = HTML_CACHE.get_or_compute(
+                    (analysis_key, 'title', video['id']),
+                    lambda: render_highlighted_text_inline(
+                        video['title'],
+                        analysis_results['title_analysis']['highlights'].for_video(video['id'])
+                    )
                 )
                 
                 # Display title with link (smaller heading)
@@ -370,240 +676,96 @@ def main():
                 # Create columns for thumbnail and metadata
                 thumb_col, meta_col = st.columns([1, 3])
                 
-                # Display thumbnail with fixed width
+                # Display thumbnail with fixed width; the browser only loads
+                # it once it scrolls into view
                 with thumb_col:
-                    st.image(video['thumbnail'], width=240)
+                    if video['thumbnail']:
+                        st.markdown(
+                            f"<img src='{html.escape(video['thumbnail'], quote=True)}' width='240' loading='lazy'>",
+                            unsafe_allow_html=True
+                        )
                 
                 # Display metadata
                 with meta_col:
                     st.write(f"**Published:** {format_datetime(video['published_at'])}")
                     st.write(f"**Views:** {video['view_count']:,}")
+                    if video['id'] in velocities:
+                        st.write(f"**Velocity:** {velocities[video['id']]:+,.0f} views/hour")
                 
                 # Tags expander with comma-separated list
                 if video.get('tags'):
-                    with st.expander("Tags"):
-                        tags_list = []
-                        
-                        for tag in video.get('tags', []):
-                            tag_lower = tag.lower()
-                            videos_with_tag = []
-                            
-                            # Check if this tag is in other videos
-                            if tag_lower in analysis_results['tag_analysis']['word_count'] and len(analysis_results['tag_analysis']['word_count'][tag_lower][1]) > 1:
-                                video_ids = analysis_results['tag_analysis']['word_count'][tag_lower][1]
-                                
-                                # Create list of videos with this tag (excluding current)
-                                for video_id in video_ids:
-                                    if video_id != video['id']:
-                                        video_idx = next((idx for idx, v in enumerate(videos_data) if v['id'] == video_id), None)
-                                        if video_idx is not None:
-                                            videos_with_tag.append(f"Video {video_idx+1}")
-                                
-                                # Common tag with highlighting
-                                if videos_with_tag:
-                                    tags_list.append(f'<span style="color: #006400; font-weight: bold;" title="Also in: {", ".join(videos_with_tag)}">{tag}</span>')
-                                else:
-                                    tags_list.append(tag)
-                            else:
-                                tags_list.append(tag)
-                        
-                        # Join tags with commas
-                        tags_html = ", ".join(tags_list)
-                        st.markdown(tags_html, unsafe_allow_html=True)
+                    tags_expander = lazy_expander("Tags", key=f"tags_{video['id']}")
+                    if expander_is_open(tags_expander):
+                        tags_html = HTML_CACHE.get_or_compute(
+                            (analysis_key, 'tags', video['id']),
+                            lambda: render_highlighted_tags(
+                                video['tags'],
+                                analysis_results['tag_analysis']['highlights'].for_video(video['id'])
+                            )
+                        )
+                        tags_expander.markdown(tags_html, unsafe_allow_html=True)
                 
-                # Description expander (YouTube-style)
+                # Description expander (YouTube-style), highlighted only
+                # once it is opened
                 if video.get('description'):
-                    with st.expander("Description"):
-                        render_highlighted_description(
-                            video['description'],
-                            analysis_results['desc_analysis']['word_count'],
-                            video['id'],
-                            videos_data
-                        )
+                    description_expander = lazy_expander("Description", key=f"description_{video['id']}")
+                    if expander_is_open(description_expander):
+                        with description_expander:
+                            render_highlighted_description(HTML_CACHE.get_or_compute(
+                                (analysis_key, 'description', video['id']),
+                                lambda: highlight_description(
+                                    video['description'],
+                                    analysis_results['desc_analysis']['highlights'].for_video(video['id'])
+                                )
+                            ))
                 
+                # View counts over time of a tracked video
+                if video['id'] in velocities:
+                    history_expander = lazy_expander("View history", key=f"history_{video['id']}")
+                    if expander_is_open(history_expander):
+                        history_expander.line_chart(view_history_df(video['id']))
+
                 # Add separator between videos
                 st.markdown("---")
 
-# Create a DataFrame for word frequencies
-def create_word_frequency_df(word_count, total_videos):
-    if not word_count:
-        return pd.DataFrame()
-    
-    # Get videos_data from session state
-    videos_data = st.session_state.videos_data
-    
-    # Create dataframe
-    data = []
-    for word, (count, video_ids) in word_count.items():
-        if count > 1:  # Only include words that appear in more than one video
-            # Create list of video URLs
-            video_urls = []
-            for video_id in video_ids:
-                for video in videos_data:
-                    if video['id'] == video_id:
-                        video_urls.append(f"https://www.youtube.com/watch?v={video['id']}")
-                        break
-            
-            # Join with commas
-            videos_text = ", ".join(video_urls)
-            
-            data.append({
-                'Word': word,
-                'Frequency': f"{count} out of {total_videos}",
-                'Videos': videos_text,
-                'Count': count  # For sorting
-            })
-    
-    if not data:
-        return pd.DataFrame()
-    
-    df = pd.DataFrame(data)
-    df = df.sort_values(by='Count', ascending=False).drop('Count', axis=1).reset_index(drop=True)
-    # Reset index to start from 1 instead of 0
-    df.index = df.index + 1
-    
-    return df
-
-# Function to render highlighted text with placeholders to prevent nested spans
-def render_highlighted_text_inline(text, word_count, current_video_id, videos_data):
-    # Create a map of common words with their videos
-    common_words = {}
-    for word, (count, video_ids) in word_count.items():
-        if count > 1:  # Only include words that appear in more than one video
-            videos_with_word = []
-            for video_id in video_ids:
-                if video_id != current_video_id:
-                    video_idx = next((idx for idx, v in enumerate(videos_data) if v['id'] == video_id), None)
-                    if video_idx is not None:
-                        videos_with_word.append(f"Video {video_idx+1}")
-            
-            if videos_with_word:
-                common_words[word] = videos_with_word
-    
-    # If no common words to highlight, return the original text
-    if not common_words:
-        return text
-    
-    # Split the text into tokens that can be individually processed
-    # This captures words, spaces, punctuation, etc., as separate items
-    tokens = re.findall(r'(\b\w+\b|\s+|[^\w\s]+)', text)
-    result_parts = []
-    
-    # Process each token
-    for token in tokens:
-        # Check if this token is a word (not whitespace or punctuation)
-        if re.match(r'^\w+$', token):
-            token_lower = token.lower()
-            # Check if this exact token is a common word
-            is_highlighted = False
-            for common_word, videos in common_words.items():
-                if token_lower == common_word.lower():
-                    # Add highlighted version of the token
-                    videos_text = ", ".join(videos)
-                    highlighted_token = f"<span style='color: #006400; font-weight: bold;' title='Also in: {videos_text}'>{token}</span>"
-                    result_parts.append(highlighted_token)
-                    is_highlighted = True
-                    break
-            
-            # If not highlighted, add the original token
-            if not is_highlighted:
-                result_parts.append(token)
-        else:
-            # For non-word tokens (spaces, punctuation), add as-is
-            result_parts.append(token)
-    
-    # Join all parts back together
-    return "".join(result_parts)
+# Function to render highlighted title with common words in green
+#
+# common_words maps each word the video shares with other videos to the
+# "Video 2, Video 5" list, see HighlightMap.for_video
+@timed('render_html')
+def render_highlighted_text_inline(text, common_words):
+    # One pass over the text; the longest common word at each position wins
+    return common_words.highlight(text)
 
-# Function to render highlighted text for tags (list format)
-def render_highlighted_text(tags, word_count, current_video_id, videos_data, is_tag=False):
+# Comma-separated tags, common tags highlighted with the other videos that have them
+@timed('render_html')
+def render_highlighted_tags(tags, tag_highlights):
+    tags_list = []
     for tag in tags:
-        tag_lower = tag.lower()
-        videos_with_tag = []
-        
-        # Check if this tag is in other videos
-        if tag_lower in word_count and len(word_count[tag_lower][1]) > 1:
-            video_ids = word_count[tag_lower][1]
-            
-            # Create list of videos with this tag (excluding current)
-            for i, video_id in enumerate(video_ids):
-                if video_id != current_video_id:
-                    video_idx = next((idx for idx, v in enumerate(videos_data) if v['id'] == video_id), None)
-                    if video_idx is not None:
-                        videos_with_tag.append(f"Video {video_idx+1}")
-            
-            # Display highlighted tag with tooltip
-            if videos_with_tag:
-                st.markdown(
-                    f"<span style='color: #006400; font-weight: bold;' "
-                    f"title='Also in: {', '.join(videos_with_tag)}'>{tag}</span>",
-                    unsafe_allow_html=True
-                )
-            else:
-                st.write(tag)
+        videos_with_tag = tag_highlights.get(tag.lower())
+        if videos_with_tag:
+            tags_list.append(f'<span style="color: #006400; font-weight: bold;" title="Also in: {videos_with_tag}">{tag}</span>')
         else:
-            st.write(tag)
+            tags_list.append(tag)
+    return ", ".join(tags_list)
+
+# Highlighted HTML of each description paragraph, None for blank lines
+@timed('render_html')
+def highlight_description(description, common_words):
+    # Highlight all common words of each paragraph in a single pass
+    return tuple(
+        common_words.highlight(paragraph) if paragraph.strip() else None
+        for paragraph in description.split('\n')
+    )
 
 # Function to render highlighted description
-def render_highlighted_description(description, word_count, current_video_id, videos_data):
-    # Create a map of common words with their videos
-    common_words = {}
-    for word, (count, video_ids) in word_count.items():
-        if count > 1:  # Only include words that appear in more than one video
-            videos_with_word = []
-            for video_id in video_ids:
-                if video_id != current_video_id:
-                    video_idx = next((idx for idx, v in enumerate(videos_data) if v['id'] == video_id), None)
-                    if video_idx is not None:
-                        videos_with_word.append(f"Video {video_idx+1}")
-            
-            if videos_with_word:
-                common_words[word] = videos_with_word
-    
-    # Process the description
-    paragraphs = description.split('\n')
-    
+def render_highlighted_description(paragraphs):
     for paragraph in paragraphs:
-        if not paragraph.strip():
+        if paragraph is None:
             st.write("")
             continue
         
-        # Use a safer approach to highlight text without causing nested tags
-        # First, find all words that need highlighting
-        highlighted_paragraph = paragraph
-        
-        # Sort words by length (longest first) to avoid partial word matches
-        sorted_words = sorted(common_words.keys(), key=len, reverse=True)
-        
-        # Create a placeholder for each match to avoid overlapping highlights
-        placeholders = {}
-        placeholder_count = 0
-        
-        for word in sorted_words:
-            # Create a regex pattern that matches the word as a whole word only
-            pattern = rf'\b{re.escape(word)}\b'
-            
-            # Find all occurrences of the word
-            for match in re.finditer(pattern, highlighted_paragraph, flags=re.IGNORECASE):
-                # Create a unique placeholder
-                placeholder = f"__PLACEHOLDER_{placeholder_count}__"
-                placeholder_count += 1
-                
-                # Store the original text and the videos info
-                videos_text = ", ".join(common_words[word])
-                placeholders[placeholder] = (match.group(0), videos_text)
-                
-                # Replace with placeholder
-                start, end = match.span()
-                highlighted_paragraph = highlighted_paragraph[:start] + placeholder + highlighted_paragraph[end:]
-        
-        # Now replace all placeholders with properly formatted HTML
-        for placeholder, (original_text, videos_text) in placeholders.items():
-            highlighted_span = f"<span style='color: #006400; font-weight: bold;' title='Also in: {videos_text}'>{original_text}</span>"
-            highlighted_paragraph = highlighted_paragraph.replace(placeholder, highlighted_span)
-        
-        # Display the safely highlighted paragraph
-        st.markdown(highlighted_paragraph, unsafe_allow_html=True)
+        st.markdown(paragraph, unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main()
+    run_with_diagnostics(main)
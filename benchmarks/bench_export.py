@@ -0,0 +1,42 @@
+import io
+import time
+import tracemalloc
+
+from benchmarks.corpus import make_videos
+from youtube_analyzer.analysis import analyze_words
+from youtube_analyzer.export import report_tables, write_report, write_xlsx
+
+
+# Seconds, peak traced memory and output size of one report
+def measure(write):
+    target = io.BytesIO()
+    tracemalloc.start()
+    start = time.perf_counter()
+    write(target)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, len(target.getvalue())
+
+
+def main():
+    for count in (1000, 10000):
+        videos = make_videos(count)
+        results = analyze_words(videos)
+        print(f"{count} videos")
+
+        runs = [
+            (output_format, lambda target, f=output_format: write_report(target, f, videos, results))
+            for output_format in ('xlsx', 'csv', 'parquet')
+        ]
+        runs.append((
+            'xlsx in memory',
+            lambda target: write_xlsx(target, report_tables(videos, results), constant_memory=False)
+        ))
+        for name, write in runs:
+            seconds, peak, size = measure(write)
+            print(f"{name:>15}: {seconds:7.2f} s  peak {peak / 2**20:7.1f} MiB  file {size / 2**20:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import random
+import re
+import time
+
+from benchmarks.corpus import WORDS
+from youtube_analyzer.highlight import HIGHLIGHT_TEMPLATE, Highlighter
+
+
+# The per-word placeholder loop render_highlighted_description used before
+def legacy_highlight(paragraph, common_words):
+    highlighted_paragraph = paragraph
+    sorted_words = sorted(common_words.keys(), key=len, reverse=True)
+    placeholders = {}
+    placeholder_count = 0
+
+    for word in sorted_words:
+        pattern = rf'\b{re.escape(word)}\b'
+        for match in re.finditer(pattern, highlighted_paragraph, flags=re.IGNORECASE):
+            placeholder = f"__PLACEHOLDER_{placeholder_count}__"
+            placeholder_count += 1
+            placeholders[placeholder] = (match.group(0), common_words[word])
+            start, end = match.span()
+            highlighted_paragraph = highlighted_paragraph[:start] + placeholder + highlighted_paragraph[end:]
+
+    for placeholder, (original_text, videos_text) in placeholders.items():
+        highlighted_span = HIGHLIGHT_TEMPLATE.format(videos=videos_text, text=original_text)
+        highlighted_paragraph = highlighted_paragraph.replace(placeholder, highlighted_span)
+
+    return highlighted_paragraph
+
+
+# Reference semantics: one \b(longest|...|shortest)\b alternation
+def reference_highlight(text, common_words, pattern):
+    return pattern.sub(
+        lambda m: HIGHLIGHT_TEMPLATE.format(videos=common_words[m.group().lower()], text=m.group()),
+        text
+    )
+
+
+def make_vocabulary(rng, size=2000):
+    syllables = ['lo', 'fi', 'chi', 'll', 'ra', 'in', 'ja', 'zz', 'so', 'ul', 'mi', 'x', 'be', 'at', 'no', 'va']
+    vocabulary = set(WORDS)
+    while len(vocabulary) < size:
+        word = ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+        # About one term in ten is a two-word phrase
+        if rng.random() < 0.1:
+            word += ' ' + rng.choice(WORDS)
+        vocabulary.add(word)
+    return sorted(vocabulary)
+
+
+def make_text(rng, vocabulary, length=5000):
+    parts = []
+    size = 0
+    while size < length:
+        word = rng.choice(vocabulary)
+        if rng.random() < 0.3:
+            word = word.title()
+        parts.append(word + rng.choice((' ', ' ', ', ', '. ', '!')))
+        size += len(parts[-1])
+    return ''.join(parts)[:length]
+
+
+def timed(function, texts):
+    start = time.perf_counter()
+    output = [function(text) for text in texts]
+    return output, time.perf_counter() - start
+
+
+def main():
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(rng)
+    common_words = {term: "Video 2, Video 7" for term in rng.sample(vocabulary, 2000)}
+    texts = [make_text(rng, vocabulary) for _ in range(50)]
+
+    start = time.perf_counter()
+    highlighter = Highlighter(common_words)
+    build_seconds = time.perf_counter() - start
+
+    alternation = '|'.join(re.escape(term) for term in sorted(common_words, key=len, reverse=True))
+    pattern = re.compile(rf'\b(?:{alternation})\b', re.IGNORECASE)
+
+    _, new_seconds = timed(lambda text: highlighter.highlight(text, common_words), texts)
+    _, reference_seconds = timed(lambda text: reference_highlight(text, common_words, pattern), texts)
+    _, legacy_seconds = timed(lambda text: legacy_highlight(text, common_words), texts[:5])
+
+    print(f"{len(texts)} texts of 5,000 chars, {len(common_words)} common terms")
+    print(f"   Highlighter build: {build_seconds * 1000:8.2f} ms")
+    print(f"         Highlighter: {new_seconds / len(texts) * 1000:8.2f} ms/text")
+    print(f"   regex alternation: {reference_seconds / len(texts) * 1000:8.2f} ms/text")
+    print(f" legacy placeholders: {legacy_seconds / 5 * 1000:8.2f} ms/text")
+
+
+if __name__ == "__main__":
+    main()
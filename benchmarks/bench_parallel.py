@@ -0,0 +1,67 @@
+import argparse
+import os
+import time
+
+from benchmarks.corpus import make_videos
+from youtube_analyzer.parallel import _tokenize_chunk, get_process_pool, shutdown_process_pools, tokenize_many
+from youtube_analyzer.tokenizer import TOKEN_CACHE
+
+
+def default_worker_counts():
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+
+# Seconds to start a pool and have every worker import the tokenizer
+def warm_up(workers):
+    start = time.perf_counter()
+    pool = get_process_pool(workers)
+    list(pool.map(_tokenize_chunk, [["warm up"]] * workers))
+    return time.perf_counter() - start
+
+
+# Best time of tokenize_many over uncached texts
+def timed(texts, workers, repeat):
+    best = float('inf')
+    tokens = None
+    for _ in range(repeat):
+        TOKEN_CACHE.clear()
+        start = time.perf_counter()
+        tokens = tokenize_many(texts, workers)
+        best = min(best, time.perf_counter() - start)
+    return tokens, best
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_parallel')
+    parser.add_argument('--videos', type=int, default=5000, help="videos in the synthetic corpus")
+    parser.add_argument('--workers', type=int, nargs='+', default=default_worker_counts())
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    videos = make_videos(args.videos)
+    texts = [text for video in videos for text in (video['title'], video['description'])]
+    print(f"{len(texts):,} texts, {sum(map(len, texts)) / 1e6:.1f}M characters, {os.cpu_count()} cores")
+
+    reference, serial_seconds = timed(texts, 1, args.repeat)
+    print(f"{'serial':>10}: {serial_seconds:7.2f} s")
+    try:
+        for workers in args.workers:
+            if workers < 2:
+                continue
+            startup = warm_up(workers)
+            tokens, seconds = timed(texts, workers, args.repeat)
+            status = "" if tokens == reference else "  MISMATCH"
+            print(f"{workers:>3} workers: {seconds:7.2f} s  speedup x{serial_seconds / seconds:5.2f}  "
+                  f"efficiency {serial_seconds / seconds / workers:4.0%}  pool startup {startup:5.2f} s{status}")
+    finally:
+        shutdown_process_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+
+from youtube_analyzer.sketch import DEFAULT_COUNT_ERROR, DEFAULT_DISTINCT_ERROR, TermSketch
+
+# Words per synthetic video, drawn from a Zipf distribution so a few terms
+# are shared by most videos and the vocabulary keeps growing with the corpus
+WORDS_PER_VIDEO = 20
+ZIPF_EXPONENT = 1.3
+
+
+# (video ID, words) of synthetic videos with a long-tailed vocabulary
+def make_documents(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        (f"video{position:08d}", [f"w{rank}" for rank in rng.zipf(ZIPF_EXPONENT, WORDS_PER_VIDEO)])
+        for position in range(count)
+    ]
+
+
+# (result, seconds, peak traced bytes) of one call
+def measure(function):
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def count_exact(documents):
+    counts = Counter()
+    for _, words in documents:
+        counts.update(dict.fromkeys(words, 1))
+    return counts
+
+
+def count_sketch(documents, args):
+    sketch = TermSketch(count_error=args.count_error, distinct_error=args.distinct_error)
+    for video_id, words in documents:
+        sketch.add(video_id, words)
+    return sketch
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_sketch')
+    parser.add_argument('--videos', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--count-error', type=float, default=DEFAULT_COUNT_ERROR)
+    parser.add_argument('--distinct-error', type=float, default=DEFAULT_DISTINCT_ERROR)
+    parser.add_argument('--top-n', type=int, default=100)
+    parser.add_argument('--shards', type=int, default=4, help="shards counted separately and merged")
+    args = parser.parse_args()
+
+    for count in args.videos:
+        documents = make_documents(count)
+        exact, exact_seconds, exact_peak = measure(lambda: count_exact(documents))
+        sketch, sketch_seconds, sketch_peak = measure(lambda: count_sketch(documents, args))
+
+        expected = [word for word, _ in exact.most_common(args.top_n)]
+        reported = sketch.top(min_count=1, top_n=args.top_n)
+        recall = len(set(expected) & {word for word, _, _ in reported}) / max(len(expected), 1)
+        worst = max((abs(estimate - exact[word]) / exact[word] for word, estimate, _ in reported), default=0)
+
+        shards = [
+            count_sketch(documents[start::args.shards], args) for start in range(args.shards)
+        ]
+        merged = shards[0]
+        for shard in shards[1:]:
+            merged = merged.merge(shard)
+        merged_top = [word for word, _, _ in merged.top(min_count=1, top_n=args.top_n)]
+        merged_recall = len(set(expected) & set(merged_top)) / max(len(expected), 1)
+
+        print(f"{count:>9,} videos, {len(exact):,} distinct terms")
+        print(f"{'exact':>12}: {exact_seconds:7.2f} s  {exact_peak / 2 ** 20:8.1f} MiB")
+        print(f"{'sketch':>12}: {sketch_seconds:7.2f} s  {sketch_peak / 2 ** 20:8.1f} MiB  "
+              f"top {args.top_n} recall {recall:.0%}, worst error {worst:.2%}, bound {sketch.error_bound():,}")
+        print(f"{f'{args.shards} shards':>12}: merged top {args.top_n} recall {merged_recall:.0%}")
+
+
+if __name__ == "__main__":
+    main()
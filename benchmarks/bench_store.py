@@ -0,0 +1,57 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import make_videos
+from youtube_analyzer.store import VideoStore
+
+
+# (result, traced bytes still held by the result) of building it
+def traced(build):
+    tracemalloc.start()
+    result = build()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, held
+
+
+def seconds(function, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_store')
+    parser.add_argument('--videos', type=int, nargs='+', default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    print(f"{'videos':>8} {'dicts':>10} {'store':>10} {'per video':>14} {'save':>9} {'load':>9} {'snapshot':>10}")
+    for count in args.videos:
+        # Each build gets its own copy of the corpus, as a fetch would
+        videos, dicts_bytes = traced(lambda: make_videos(count))
+        store, store_bytes = traced(lambda: VideoStore.from_videos(make_videos(count)))
+        assert store[count // 2] == videos[count // 2]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'videos.parquet')
+            save_seconds = seconds(lambda: store.save_parquet(path))
+            load_seconds = seconds(lambda: VideoStore.load_parquet(path))
+            size = os.path.getsize(path)
+
+        print(f"{count:>8,} {dicts_bytes / 2 ** 20:>8.1f}MB {store_bytes / 2 ** 20:>8.1f}MB "
+              f"{dicts_bytes / count:>6,.0f}->{store_bytes / count:>5,.0f}B "
+              f"{save_seconds * 1000:>7.0f}ms {load_seconds * 1000:>7.0f}ms {size / 2 ** 20:>8.1f}MB")
+
+    lookups = store.video_ids[::max(1, len(store) // 1000)]
+    lookup_seconds = seconds(lambda: [store.get(video_id) for video_id in lookups])
+    print(f"get by ID: {lookup_seconds / len(lookups) * 1e6:.1f} us per video")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.corpus import make_videos
+from benchmarks.fake_api import FakeYouTubeAPI
+from youtube_analyzer.analysis import analyze_words, count_words_across_videos, tokenize_video
+from youtube_analyzer.cache import VideoCache
+from youtube_analyzer.frequency import create_word_frequency_df
+from youtube_analyzer.memo import CACHES
+from youtube_analyzer.similarity import DEFAULT_FIELD_WEIGHTS, video_similarity
+from youtube_analyzer.quota import QuotaLedger, QuotaScheduler
+from youtube_analyzer.tokenizer import tokenize_text
+from youtube_analyzer.videos import get_video_details
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+# Stages are slower than their baseline beyond this ratio, and the difference
+# is at least MIN_REGRESSION_SECONDS, to be reported as regressions
+DEFAULT_TOLERANCE = 0.2
+MIN_REGRESSION_SECONDS = 0.001
+
+# IDs requested by the fetch stages that the fake API does not know
+MISSING_SHARE = 0.01
+
+# Videos of the largest details page the app renders at once
+RENDER_PAGE_SIZE = 100
+
+
+# Every memoized result is dropped, so each stage pays its full cost
+def clear_memo_caches():
+    for cache in CACHES.values():
+        cache.clear()
+
+
+# Fetch stages: get_video_details against the fake API with its own cache
+# and quota ledger in a temporary directory
+class FetchContext:
+    def __init__(self, videos, args):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, 'cache.sqlite')
+        self.cache = VideoCache(path)
+        self.ledger = QuotaLedger(path)
+        self.api = FakeYouTubeAPI(videos, latency=args.latency, jitter=args.latency / 2,
+                                  error_rate=args.error_rate, seed=args.seed)
+        self.backoff = args.latency
+        missing = [f"missing{i:04d}" for i in range(math.ceil(len(videos) * MISSING_SHARE))]
+        self.video_ids = [video['id'] for video in videos] + missing
+
+    def fetch(self):
+        scheduler = QuotaScheduler(run_budget=10 ** 9, daily_budget=10 ** 9, ledger=self.ledger,
+                                   backoff_base=self.backoff)
+        return get_video_details('benchmark', self.video_ids, cache=self.cache, scheduler=scheduler, client=self.api)
+
+    def close(self):
+        self.api.close()
+        self.cache._conn.close()
+        self.ledger._conn.close()
+        self.directory.cleanup()
+
+
+def setup_fetch(videos, args):
+    context = FetchContext(videos, args)
+    return context.fetch, context.close
+
+
+def setup_fetch_cached(videos, args):
+    context = FetchContext(videos, args)
+    context.fetch()
+    return context.fetch, context.close
+
+
+def setup_tokenize(videos, args):
+    texts = [video['title'] for video in videos] + [video['description'] for video in videos]
+    return lambda: [tokenize_text(text) for text in texts], None
+
+
+def setup_count_words(videos, args):
+    words_per_video = {video['id']: tokenize_video(video)[2] for video in videos}
+    return lambda: count_words_across_videos(words_per_video), None
+
+
+def setup_analyze(videos, args):
+    return lambda: analyze_words(videos), None
+
+
+def setup_frequency(videos, args):
+    # Importing pandas is a one-off cost, not part of the stage
+    import pandas  # noqa: F401
+
+    results = analyze_words(videos)
+
+    def build():
+        return [
+            create_word_frequency_df(results[field]['word_count'], len(videos))
+            for field in ('title_analysis', 'tag_analysis', 'desc_analysis')
+        ]
+
+    return build, None
+
+
+def setup_similarity(videos, args):
+    results = analyze_words(videos)
+    field_indexes = {field: results[field]['word_count'] for field in DEFAULT_FIELD_WEIGHTS}
+    return lambda: video_similarity(field_indexes), None
+
+
+# The HTML of one page of the video details section: highlighted titles,
+# tags and description paragraphs of the first RENDER_PAGE_SIZE videos
+def setup_render(videos, args):
+    results = analyze_words(videos)
+
+    def render():
+        fragments = 0
+        for video in videos[:RENDER_PAGE_SIZE]:
+            title = results['title_analysis']['highlights'].for_video(video['id'])
+            tags = results['tag_analysis']['highlights'].for_video(video['id'])
+            description = results['desc_analysis']['highlights'].for_video(video['id'])
+            fragments += len(title.highlight(video['title']))
+            fragments += sum(len(tags.get(tag.lower(), tag)) for tag in video['tags'])
+            fragments += sum(
+                len(description.highlight(paragraph))
+                for paragraph in video['description'].split('\n') if paragraph.strip()
+            )
+        return fragments
+
+    return render, None
+
+
+# (name, setup) of every stage; setup(videos, args) returns the callable to
+# measure and an optional cleanup, and is not measured itself
+STAGES = (
+    ('fetch', setup_fetch),
+    ('fetch_cached', setup_fetch_cached),
+    ('tokenize_text', setup_tokenize),
+    ('count_words_across_videos', setup_count_words),
+    ('analyze_words', setup_analyze),
+    ('create_word_frequency_df', setup_frequency),
+    ('video_similarity', setup_similarity),
+    ('render', setup_render)
+)
+
+
+# (best wall time in seconds, peak traced bytes) of one stage
+#
+# Memory is traced in a separate run, tracemalloc slows the code it traces.
+def measure(setup, videos, args):
+    best = float('inf')
+    for attempt in range(args.repeat + 1):
+        clear_memo_caches()
+        run, cleanup = setup(videos, args)
+        clear_memo_caches()
+        gc.collect()
+        try:
+            if attempt < args.repeat:
+                start = time.perf_counter()
+                run()
+                best = min(best, time.perf_counter() - start)
+            else:
+                tracemalloc.start()
+                run()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+        finally:
+            if cleanup is not None:
+                cleanup()
+    return best, peak
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return revision + ('-dirty' if dirty else '')
+
+
+# Exponent k of time ~ videos^k between the two largest sizes
+def scaling_exponent(points):
+    (small, small_seconds), (large, large_seconds) = points[-2:]
+    if small_seconds <= 0 or large_seconds <= 0:
+        return float('nan')
+    return math.log(large_seconds / small_seconds) / math.log(large / small)
+
+
+def print_results(results, sizes):
+    print(f"{'stage':>26}" + ''.join(f"{size:>12,}" for size in sizes) + "   scaling   peak memory")
+    for stage, _ in STAGES:
+        rows = sorted((row for row in results if row['stage'] == stage), key=lambda row: row['videos'])
+        if not rows:
+            continue
+        line = f"{stage:>26}" + ''.join(f"{row['seconds'] * 1000:>10.1f}ms" for row in rows)
+        if len(rows) > 1:
+            line += f"   ~n^{scaling_exponent([(row['videos'], row['seconds']) for row in rows]):.2f}"
+        line += f"   {rows[-1]['peak_bytes'] / 2 ** 20:9.1f} MiB"
+        print(line)
+
+
+# Stages slower than the baseline file beyond the tolerance, printed as a table
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, encoding='utf-8') as file:
+        baseline = json.load(file)
+    previous = {(row['stage'], row['videos']): row for row in baseline['results']}
+
+    print(f"\ncompared with {baseline['meta']['commit']} ({baseline_path})")
+    regressions = []
+    for row in results:
+        old = previous.get((row['stage'], row['videos']))
+        if old is None:
+            continue
+        ratio = row['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        regressed = ratio > 1 + tolerance and row['seconds'] - old['seconds'] > MIN_REGRESSION_SECONDS
+        if regressed:
+            regressions.append(row)
+        print(f"{row['stage']:>26} {row['videos']:>7,}: {old['seconds'] * 1000:10.1f}ms -> "
+              f"{row['seconds'] * 1000:10.1f}ms  x{ratio:5.2f}  "
+              f"memory x{row['peak_bytes'] / max(old['peak_bytes'], 1):5.2f}"
+              + ("  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.bench_suite',
+        description="Time and trace every analysis stage on synthetic corpora of growing size."
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="corpus sizes in videos")
+    parser.add_argument('--stages', nargs='+', choices=[name for name, _ in STAGES],
+                        help="stages to run, all by default")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage, the fastest is kept")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the synthetic corpus")
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds per fake videos.list call")
+    parser.add_argument('--error-rate', type=float, default=0.02, help="share of fake calls failing with 503")
+    parser.add_argument('-o', '--output', help="results file, benchmark_results/<commit>.json by default")
+    parser.add_argument('--baseline', help="results file of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="slowdown ratio over the baseline reported as a regression")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be positive")
+    return args
+
+
+# Run the selected stages for every size and write the results as JSON
+#
+# Returns 1 when a baseline is given and some stage regressed, 0 otherwise.
+def main(argv=None):
+    args = parse_args(argv)
+    stages = [(name, setup) for name, setup in STAGES if args.stages is None or name in args.stages]
+    sizes = sorted(args.sizes)
+    commit = git_revision()
+
+    results = []
+    for size in sizes:
+        videos = make_videos(size, seed=args.seed)
+        for name, setup in stages:
+            seconds, peak = measure(setup, videos, args)
+            results.append({'stage': name, 'videos': size, 'seconds': seconds, 'peak_bytes': peak})
+            print(f"{name:>26} {size:>7,}: {seconds * 1000:10.1f}ms  {peak / 2 ** 20:8.1f} MiB",
+                  file=sys.stderr, flush=True)
+
+    print_results(results, sizes)
+
+    output = args.output or os.path.join('benchmark_results', f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump({
+            'meta': {
+                'commit': commit,
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': args.seed,
+                'repeat': args.repeat,
+                'latency': args.latency,
+                'error_rate': args.error_rate
+            },
+            'results': results
+        }, file, indent=2)
+    print(f"results written to {output}")
+
+    if args.baseline:
+        return 1 if compare(results, args.baseline, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import random
+import re
+import time
+
+from benchmarks.corpus import WORDS, make_videos
+from youtube_analyzer.tokenizer import DEFAULT_TOKENIZER
+
+
+# The multi-pass tokenize_text the Tokenizer replaced, kept as the reference
+def legacy_tokenize_text(text):
+    url_pattern = r'(https?:\/\/)?(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)'
+    re.findall(url_pattern, text, flags=re.IGNORECASE)
+    text = re.sub(url_pattern, ' ', text, flags=re.IGNORECASE).lower()
+
+    word_variants = {
+        'lo-fi': 'lofi',
+        'lo fi': 'lofi',
+        'hip-hop': 'hiphop',
+        'hip hop': 'hiphop',
+        'r&b': 'rnb',
+        'r & b': 'rnb'
+    }
+    for variant, normalized in word_variants.items():
+        text = text.replace(variant, normalized)
+
+    multi_word_phrases = ["hiphop", "lofi beats", "chill mix", "study music",
+                          "relaxing music", "sleep music", "ambient music",
+                          "background music", "piano music", "jazz music",
+                          "lofi chill", "chill out", "deep house"]
+    for phrase in multi_word_phrases:
+        if phrase in text:
+            text = text.replace(phrase, phrase.replace(' ', '_'))
+
+    normalized_words = [word.replace('-', '') for word in re.findall(r'\b[\w\-]+\b', text)]
+
+    stop_words = {
+        'a', 'an', 'the', 'and', 'or', 'but', 'if', 'because', 'as', 'what',
+        'when', 'where', 'how', 'why', 'which', 'who', 'whom', 'this', 'that',
+        'these', 'those', 'in', 'on', 'at', 'by', 'for', 'with', 'about',
+        'against', 'between', 'into', 'through', 'during', 'before', 'after',
+        'above', 'below', 'to', 'from', 'up', 'down', 'is', 'am', 'are',
+        'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having',
+        'do', 'does', 'did', 'doing', 'i', 'you', 'he', 'she', 'it', 'we', 'they',
+        'me', 'him', 'her', 'us', 'them', 'my', 'your', 'his', 'its', 'our', 'their',
+        'can', 'could', 'will', 'would', 'shall', 'should', 'may', 'might', 'must'
+    }
+    return [word.replace('_', ' ') if '_' in word else word
+            for word in normalized_words if word not in stop_words and len(word) > 2]
+
+
+# Fragments that stress the joins: variants and phrases glued to each other
+# and to neighbouring letters, for the equivalence tests
+FUZZ_FRAGMENTS = tuple(WORDS) + (
+    "x", "o", "p", "iano", "ackground", "-", "&", "_", "lofi", "hiphop", "rnb",
+    "chill", "mix", "out", "music", "beats", "house", "deep", "lo", "fi", "hip",
+    "hop", "r", "b", "ESCAPE", ".", "www.a.com"
+)
+
+
+def fuzz_texts(count, seed=1):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield ''.join(rng.choice(FUZZ_FRAGMENTS) + rng.choice(('', ' ', ' ', '  ', '\n'))
+                      for _ in range(rng.randint(1, 20)))
+
+
+def throughput(tokenize, texts, repeat=3):
+    best = float('inf')
+    tokens = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = sum(len(tokenize(text)) for text in texts)
+        best = min(best, time.perf_counter() - start)
+    return tokens, best
+
+
+def main():
+    videos = make_videos(1000)
+    texts = [video['description'] for video in videos] + [video['title'] for video in videos]
+
+    for name, tokenize in (("legacy tokenize_text", legacy_tokenize_text), ("Tokenizer", DEFAULT_TOKENIZER.tokenize)):
+        tokens, seconds = throughput(tokenize, texts)
+        print(f"{name:>22}: {tokens / seconds:>12,.0f} tokens/sec ({seconds * 1000:.1f} ms for {len(texts)} texts)")
+
+
+if __name__ == "__main__":
+    main()
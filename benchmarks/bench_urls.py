@@ -0,0 +1,101 @@
+import argparse
+import random
+import re
+import string
+import time
+from urllib.parse import parse_qs, urlparse
+
+from youtube_analyzer.sources import CHANNEL_PATH_PATTERN, parse_source
+
+ID_CHARACTERS = string.ascii_letters + string.digits + '-_'
+
+# Shapes of pasted lines, with their share of a synthetic list
+LINE_TEMPLATES = (
+    ("https://www.youtube.com/watch?v={}", 0.6),
+    ("https://youtu.be/{}?si=share", 0.15),
+    ("https://www.youtube.com/shorts/{}", 0.1),
+    ("youtube.com/watch?v={}&t=42s", 0.05),
+    ("https://example.com/page/{}", 0.05),
+    ("{} is not a link", 0.05)
+)
+
+
+# The four-pattern extract_video_id and the parse_source built on it that
+# VIDEO_URL_PATTERN replaced, kept as the reference
+def legacy_extract_video_id(url):
+    patterns = [
+        r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
+        r'(?:embed\/)([0-9A-Za-z_-]{11})',
+        r'(?:shorts\/)([0-9A-Za-z_-]{11})',
+        r'(?:youtu\.be\/)([0-9A-Za-z_-]{11})'
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def legacy_parse_source(url):
+    url = url.strip()
+    if url.startswith('@'):
+        return ('handle', url.split('/')[0])
+
+    parsed = urlparse(url if '://' in url else 'https://' + url)
+    if parsed.netloc.lower().split(':')[0].endswith('youtube.com'):
+        query = parse_qs(parsed.query)
+        if 'list' in query and 'v' not in query:
+            return ('playlist', query['list'][0])
+
+        match = CHANNEL_PATH_PATTERN.match(parsed.path)
+        if match:
+            kind = match.lastgroup
+            if kind == 'custom':
+                return ('handle', '@' + match.group(kind))
+            return (kind, match.group(kind))
+
+    video_id = legacy_extract_video_id(url)
+    if video_id:
+        return ('video', video_id)
+    return None
+
+
+# Pasted lines over `count` distinct videos, a tenth of them repeated
+def make_url_lines(count, seed=0):
+    rng = random.Random(seed)
+    templates, weights = zip(*LINE_TEMPLATES)
+    lines = [
+        rng.choices(templates, weights)[0].format(''.join(rng.choices(ID_CHARACTERS, k=11)))
+        for _ in range(count)
+    ]
+    lines += rng.sample(lines, count // 10)
+    rng.shuffle(lines)
+    return lines
+
+
+def seconds(function, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_urls')
+    parser.add_argument('--lines', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'lines':>8} {'legacy':>12} {'parse_source':>13} {'speedup':>8}")
+    for count in args.lines:
+        lines = make_url_lines(count)
+        legacy_seconds = seconds(lambda: [legacy_parse_source(line) for line in lines])
+        pattern_seconds = seconds(lambda: [parse_source(line) for line in lines])
+        total = len(lines)
+        print(f"{total:>8,} {total / legacy_seconds:>10,.0f}/s {total / pattern_seconds:>11,.0f}/s "
+              f"{legacy_seconds / pattern_seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
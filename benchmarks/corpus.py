@@ -0,0 +1,58 @@
+import random
+
+# Vocabulary resembling music channel uploads, including the variant spellings
+# and phrases the tokenizer normalizes
+WORDS = (
+    "lofi lo-fi lo fi hip hop hip-hop r&b r & b beats chill mix study music relaxing "
+    "sleep ambient background piano jazz deep house chill out rain sounds night "
+    "coffee shop vibes playlist radio live stream focus work calm cozy autumn "
+    "winter summer morning evening guitar synthwave retro tokyo city pop soul "
+    "instrumental acoustic meditation yoga spa nature ocean waves forest birds "
+    "the and for with your this that from into about what when how"
+).split(' ')
+
+URLS = (
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://open.spotify.com/playlist/37i9dQZF1DX8Uebhn9wzrS",
+    "http://instagram.com/lofigirl",
+    "www.example.com/merch",
+    "https://bit.ly/3xYzAbC"
+)
+
+
+def make_title(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))).title()
+
+
+def make_tags(rng):
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) for _ in range(rng.randint(0, 25))]
+
+
+def make_description(rng, url_density=0.03):
+    lines = []
+    for _ in range(rng.randint(3, 30)):
+        parts = []
+        for _ in range(rng.randint(3, 25)):
+            parts.append(rng.choice(URLS) if rng.random() < url_density else rng.choice(WORDS))
+        lines.append(' '.join(parts) + rng.choice(('', '.', '!', ' 🎧')))
+    return '\n'.join(lines)
+
+
+# Seeded synthetic videos in the shape get_video_details returns
+#
+# Titles run 4-12 words, tag lists 0-25 tags of 1-3 words and descriptions
+# 3-30 lines, with url_density of the description words being links.
+def make_videos(count, seed=0, url_density=0.03):
+    rng = random.Random(seed)
+    return [
+        {
+            'id': f"{i:011d}",
+            'title': make_title(rng),
+            'description': make_description(rng, url_density),
+            'tags': make_tags(rng),
+            'thumbnail': '',
+            'view_count': rng.randint(0, 10_000_000),
+            'published_at': '2024-01-01T00:00:00Z'
+        }
+        for i in range(count)
+    ]
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from youtube_analyzer.client import MAX_FETCH_WORKERS
+
+
+# videos.list item of a synthetic video, as the API would return it
+def video_item(video, part):
+    item = {'id': video['id'], 'statistics': {'viewCount': str(video['view_count'])}}
+    if 'snippet' in part:
+        item['snippet'] = {
+            'title': video['title'],
+            'description': video['description'],
+            'tags': video['tags'],
+            'publishedAt': video['published_at'],
+            'thumbnails': {'high': {'url': video['thumbnail']}}
+        }
+    return item
+
+
+def http_error(status, reason=''):
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+    content = json.dumps({'error': {'code': status, 'errors': [{'reason': reason}]}}).encode('utf-8')
+    return HttpError(httplib2.Response({'status': status}), content)
+
+
+class FakeRequest:
+    def __init__(self, api, part, video_ids):
+        self.api = api
+        self.part = part
+        self.video_ids = video_ids
+        self.headers = {}
+
+    def execute(self, http=None, num_retries=0):
+        return self.api.respond(self)
+
+
+class FakeVideos:
+    def __init__(self, api):
+        self.api = api
+
+    def list(self, part, id):
+        return FakeRequest(self.api, part, id.split(','))
+
+
+class FakeService:
+    def __init__(self, api):
+        self.api = api
+
+    def videos(self):
+        return FakeVideos(self.api)
+
+
+# Local stand-in for the videos.list endpoint of the YouTube Data API
+#
+# Serves a fixed set of video dicts (see benchmarks.corpus.make_videos) with
+# a simulated round trip of latency +- jitter seconds. A share of calls,
+# error_rate, fails with a retryable 503; IDs not in the set come back
+# missing, like private or deleted videos. Responses carry ETags and
+# If-None-Match requests for unchanged chunks get a 304, as from the API.
+# Pass it as the client of get_video_details.
+class FakeYouTubeAPI:
+    def __init__(self, videos, latency=0.0, jitter=0.0, error_rate=0.0, seed=0,
+                 max_workers=MAX_FETCH_WORKERS):
+        self.videos = {video['id']: video for video in videos}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.service = FakeService(self)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fake-api')
+
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self.not_modified = 0
+
+    def respond(self, request):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            failed = self._rng.random() < self.error_rate
+            self.errors += failed
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise http_error(503, 'backendError')
+
+        items = [
+            video_item(self.videos[video_id], request.part)
+            for video_id in request.video_ids if video_id in self.videos
+        ]
+        etag = hashlib.md5(json.dumps(items, sort_keys=True).encode('utf-8')).hexdigest()
+        if request.headers.get('If-None-Match') == etag:
+            with self._lock:
+                self.not_modified += 1
+            raise http_error(304)
+        return {'etag': etag, 'items': items}
+
+    # The YouTubeClient interface get_video_details relies on
+    def execute(self, request):
+        return request.execute()
+
+    def submit_all(self, requests, scheduler=None, method='videos.list'):
+        if scheduler is None:
+            return [self.executor.submit(self.execute, request) for request in requests]
+        return [
+            self.executor.submit(scheduler.execute, self.execute, request, method)
+            for request in requests
+        ]
+
+    def close(self):
+        self.executor.shutdown()
@@ -0,0 +1,19 @@
+import random
+import re
+
+from benchmarks.bench_highlight import make_text, make_vocabulary, reference_highlight
+from youtube_analyzer.highlight import Highlighter
+
+
+def test_matches_alternation_reference():
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(rng)
+    common_words = {term: "Video 2, Video 7" for term in rng.sample(vocabulary, 2000)}
+    texts = [make_text(rng, vocabulary) for _ in range(50)]
+
+    highlighter = Highlighter(common_words)
+    alternation = '|'.join(re.escape(term) for term in sorted(common_words, key=len, reverse=True))
+    pattern = re.compile(rf'\b(?:{alternation})\b', re.IGNORECASE)
+
+    for text in texts:
+        assert highlighter.highlight(text, common_words) == reference_highlight(text, common_words, pattern)
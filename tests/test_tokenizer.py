@@ -0,0 +1,18 @@
+from benchmarks.bench_tokenizer import fuzz_texts, legacy_tokenize_text
+from benchmarks.corpus import make_videos
+from youtube_analyzer.tokenizer import DEFAULT_TOKENIZER
+
+
+# Texts the Tokenizer splits differently from the legacy tokenize_text
+def mismatches(texts):
+    return [text for text in texts if DEFAULT_TOKENIZER.tokenize(text) != legacy_tokenize_text(text)]
+
+
+def test_matches_legacy_on_corpus():
+    videos = make_videos(1000)
+    texts = [video['description'] for video in videos] + [video['title'] for video in videos]
+    assert mismatches(texts) == []
+
+
+def test_matches_legacy_on_fuzzed_joins():
+    assert mismatches(fuzz_texts(50_000)) == []
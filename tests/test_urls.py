@@ -0,0 +1,9 @@
+import pytest
+
+from tests.url_corpus import CASES
+from youtube_analyzer.sources import parse_source
+
+
+@pytest.mark.parametrize('url, expected', CASES)
+def test_parse_source(url, expected):
+    assert parse_source(url) == expected
@@ -0,0 +1,61 @@
+# URL inputs and what parse_source should make of them, see test_urls. The
+# legacy parser took the "misparsed before" cases for videos.
+CASES = (
+    # Watch links
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", ('video', 'dQw4w9WgXcQ')),
+    ("http://youtube.com/watch?v=dQw4w9WgXcQ", ('video', 'dQw4w9WgXcQ')),
+    ("www.youtube.com/watch?v=dQw4w9WgXcQ", ('video', 'dQw4w9WgXcQ')),
+    ("youtube.com/watch?v=dQw4w9WgXcQ&t=42s", ('video', 'dQw4w9WgXcQ')),
+    ("https://m.youtube.com/watch?v=dQw4w9WgXcQ", ('video', 'dQw4w9WgXcQ')),
+    ("https://music.youtube.com/watch?v=dQw4w9WgXcQ&feature=share", ('video', 'dQw4w9WgXcQ')),
+    ("https://www.youtube.com/watch?feature=player_embedded&v=dQw4w9WgXcQ", ('video', 'dQw4w9WgXcQ')),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI", ('video', 'dQw4w9WgXcQ')),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ#t=30", ('video', 'dQw4w9WgXcQ')),
+    ("HTTPS://WWW.YOUTUBE.COM/watch?v=dQw4w9WgXcQ", ('video', 'dQw4w9WgXcQ')),
+    ("  https://www.youtube.com/watch?v=_-9aZ0zy-_A  ", ('video', '_-9aZ0zy-_A')),
+
+    # Short, embed and other video paths
+    ("https://youtu.be/dQw4w9WgXcQ", ('video', 'dQw4w9WgXcQ')),
+    ("youtu.be/dQw4w9WgXcQ?si=abc123&t=10", ('video', 'dQw4w9WgXcQ')),
+    ("https://www.youtube.com/shorts/dQw4w9WgXcQ", ('video', 'dQw4w9WgXcQ')),
+    ("https://youtube.com/shorts/dQw4w9WgXcQ?feature=share", ('video', 'dQw4w9WgXcQ')),
+    ("https://www.youtube.com/embed/dQw4w9WgXcQ?autoplay=1", ('video', 'dQw4w9WgXcQ')),
+    ("https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ", ('video', 'dQw4w9WgXcQ')),
+    ("https://www.youtube.com/live/dQw4w9WgXcQ?si=x", ('video', 'dQw4w9WgXcQ')),
+    ("https://www.youtube.com/v/dQw4w9WgXcQ?version=3", ('video', 'dQw4w9WgXcQ')),
+
+    # Playlists and channels
+    ("https://www.youtube.com/playlist?list=PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI",
+     ('playlist', 'PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI')),
+    ("https://www.youtube.com/embed/videoseries?list=PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI",
+     ('playlist', 'PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI')),
+    ("https://www.youtube.com/channel/UCuAXFkgsw1L7xaCfnd5JJOw", ('channel', 'UCuAXFkgsw1L7xaCfnd5JJOw')),
+    ("https://www.youtube.com/@LofiGirl/videos", ('handle', '@LofiGirl')),
+    ("@LofiGirl", ('handle', '@LofiGirl')),
+    ("https://www.youtube.com/user/LofiGirlName", ('username', 'LofiGirlName')),
+    ("https://www.youtube.com/c/LofiGirl", ('handle', '@LofiGirl')),
+
+    # Not videos; misparsed as videos before
+    ("https://www.youtube.com/feed/subscriptions", None),
+    ("https://example.com/dQw4w9WgXcQ", None),
+    ("https://evilyoutube.com/watch?v=dQw4w9WgXcQ", None),
+    ("https://youtu.be/dQw4w9WgXcQxyz", None),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQxyz", None),
+    ("https://www.youtube.com/shorts/dQw4w9WgXcQ123", None),
+    ("https://open.spotify.com/playlist/37i9dQZF1DX8Uebhn9wzrS", None),
+
+    # Playlists and channels on lookalike hosts
+    ("https://evilyoutube.com/playlist?list=PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI", None),
+    ("https://evilyoutube.com/@LofiGirl", None),
+
+    # Not videos
+    ("https://www.youtube.com/watch?v=dQw4w9", None),
+    ("https://www.youtube.com/results?search_query=lofi+hip+hop", None),
+    ("https://youtu.be/", None),
+    ("https://www.youtube.com/", None),
+    ("not a url", None),
+    ("dQw4w9WgXc", None),
+    ("dQw4w9WgXcQ", None),
+    ("programming", None),
+    ("hello_world", None),
+)
@@ -0,0 +1 @@
+# Streamlit-free building blocks of the YouTube Video Analyzer
@@ -0,0 +1,178 @@
+from youtube_analyzer.diagnostics import stage
+from youtube_analyzer.highlight import HighlightMap
+from youtube_analyzer.memo import LRUCache, text_digest
+from youtube_analyzer.parallel import tokenize_many
+from youtube_analyzer.tokenizer import tokenize_text
+
+# Analyzed fields, in the order tokenize_video returns their words
+FIELDS = ('title_analysis', 'tag_analysis', 'desc_analysis')
+
+# Analyses shared by every session of the process, bounded by the total
+# number of analyzed videos they hold
+ANALYSIS_CACHE_SIZE = 5000
+ANALYSIS_CACHE = LRUCache('analysis', ANALYSIS_CACHE_SIZE, weight=lambda state: len(state) + 1)
+
+
+# Words of the title, tags and description of one video
+def tokenize_video(video):
+    return (
+        tokenize_text(video['title']),
+        # Tags are already in a list
+        [tag.lower() for tag in video.get('tags', [])],
+        tokenize_text(video['description'])
+    )
+
+# tokenize_video of many videos at once, in a process pool of `workers`
+# when they carry enough text, see tokenize_many
+def tokenize_videos(videos, workers=None):
+    videos = list(videos)
+    tokens = tokenize_many([text for video in videos for text in (video['title'], video['description'])], workers)
+    return [
+        (tokens[2 * i], [tag.lower() for tag in video.get('tags', [])], tokens[2 * i + 1])
+        for i, video in enumerate(videos)
+    ]
+
+# Function to analyze common and unique words
+def analyze_words(videos_data, workers=None):
+    return get_analysis(videos_data, workers=workers)[1].results()
+
+# Digest of the texts of a video the analysis reads
+def video_text_digest(video):
+    return text_digest(video['title'], '\n'.join(video.get('tags', [])), video['description'])
+
+# Cache key of an analysis: the video IDs in display order, since "Video N"
+# labels follow it, and the text of each video, which a refetch can change
+def analysis_key(videos_data):
+    return text_digest(*(
+        part
+        for video in videos_data
+        for part in (video['id'], video_text_digest(video).hex())
+    )).hex()
+
+# (key, AnalysisState) of videos_data, from the cache when possible
+#
+# A cache miss starts from a copy of `base`, the analysis the videos were
+# last shown with, so only the difference is tokenized and merged. Cached
+# states are shared and never updated in place. workers is passed on to
+# tokenize_videos.
+def get_analysis(videos_data, base=None, workers=None):
+    key = analysis_key(videos_data)
+    state = ANALYSIS_CACHE.get(key)
+    if state is None:
+        with stage('analyze_words'):
+            state = AnalysisState() if base is None else base.copy()
+            state.update(videos_data, workers)
+        ANALYSIS_CACHE.put(key, state)
+    return key, state
+
+# Count how many videos contain each word
+def count_words_across_videos(words_per_video):
+    from youtube_analyzer.index import TermIndex
+
+    # Each word is counted once per video; the index still reads as
+    # word -> (count, [video IDs])
+    return TermIndex(words_per_video)
+
+# Word analysis of a set of videos, kept up to date as videos come and go
+#
+# Each video is tokenized once, when it is added, and its terms are merged
+# into the per-field term indexes; removing a video takes its terms out
+# again. The frequency tables keep their joined URL lists between updates
+# and only rejoin them for the terms of the added or removed videos.
+# results() has the shape analyze_words returns. Only a digest of each
+# video's texts is kept, not the video itself.
+class AnalysisState:
+    def __init__(self):
+        self.videos = {}
+        self.words_per_video = {field: {} for field in FIELDS}
+        self.word_counts = {field: count_words_across_videos({}) for field in FIELDS}
+        self.url_lists = {field: {} for field in FIELDS}
+        self._results = None
+
+    def __len__(self):
+        return len(self.videos)
+
+    # Independent state to update without touching this one
+    def copy(self):
+        state = AnalysisState.__new__(AnalysisState)
+        state.videos = dict(self.videos)
+        state.words_per_video = {field: dict(words) for field, words in self.words_per_video.items()}
+        state.word_counts = {field: index.copy() for field, index in self.word_counts.items()}
+        state.url_lists = {field: dict(url_lists) for field, url_lists in self.url_lists.items()}
+        state._results = None
+        return state
+
+    # Bring the analyzed set in line with videos_data, in its order
+    #
+    # Videos already analyzed are kept as they are unless their title, tags
+    # or description changed. Returns the IDs of the added and removed videos.
+    def update(self, videos_data, workers=None):
+        new_videos = {}
+        added = {}
+        removed = []
+        for video in videos_data:
+            video_id = video['id']
+            if video_id in new_videos:
+                continue
+            digest = new_videos[video_id] = video_text_digest(video)
+            old = self.videos.get(video_id)
+            if old is None:
+                added[video_id] = video
+            elif old != digest:
+                removed.append(video_id)
+                added[video_id] = video
+        removed[:0] = [video_id for video_id in self.videos if video_id not in new_videos]
+
+        # Kept videos stay in their relative order and added ones go last,
+        # anything else moves video positions and needs an explicit order
+        kept = [video_id for video_id in self.videos if video_id in new_videos and video_id not in added]
+        order = list(new_videos)
+        reordered = kept + list(added) != order
+        self.videos = new_videos
+
+        if not (added or removed or reordered):
+            return [], []
+
+        tokens = dict(zip(added, tokenize_videos(added.values(), workers)))
+        for field_number, field in enumerate(FIELDS):
+            words_per_video = self.words_per_video[field]
+            index = self.word_counts[field]
+            url_lists = self.url_lists[field]
+
+            field_added = {video_id: words[field_number] for video_id, words in tokens.items()}
+            if reordered:
+                url_lists.clear()
+            else:
+                # URL lists of the terms the changed videos contain are stale
+                for video_id in removed:
+                    for term_id in index.term_ids_of(video_id):
+                        url_lists.pop(index.terms[term_id], None)
+                for words in field_added.values():
+                    for word in words:
+                        url_lists.pop(word, None)
+
+            for video_id in removed:
+                del words_per_video[video_id]
+            words_per_video.update(field_added)
+            if reordered:
+                self.words_per_video[field] = {video_id: words_per_video[video_id] for video_id in order}
+
+            index.update(added=field_added, removed=removed, order=order if reordered else None)
+
+        self._results = None
+        return list(added), [video_id for video_id in removed if video_id not in added]
+
+    def results(self):
+        if self._results is None:
+            self._results = {
+                field: {
+                    'words_per_video': self.words_per_video[field],
+                    'word_count': self.word_counts[field],
+                    'highlights': HighlightMap(self.word_counts[field]),
+                    'url_lists': self.url_lists[field]
+                }
+                for field in FIELDS
+            }
+            # Position of each video in the analyzed set, shared by all fields
+            self._results['video_positions'] = self.word_counts['title_analysis'].video_positions
+        return self._results
@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+# Location of the on-disk cache, can be overridden through the environment
+DEFAULT_CACHE_PATH = os.environ.get('YOUTUBE_ANALYZER_CACHE', '.youtube_cache.sqlite')
+
+# Title, tags and description rarely change, view counts change constantly
+STATIC_TTL = 7 * 24 * 60 * 60
+VOLATILE_TTL = 60 * 60
+
+# Fields of a video dict that are refreshed with the volatile TTL
+VOLATILE_FIELDS = ('view_count',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    static_fetched_at REAL NOT NULL,
+    stats_fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS list_etags (
+    request_key TEXT PRIMARY KEY,
+    etag TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+# SQLite limits the number of bound parameters per statement
+SQL_BATCH_SIZE = 500
+
+# Seconds a write waits for another connection's write to finish before
+# failing with "database is locked"
+BUSY_TIMEOUT = 30
+
+
+# Connection to the cache database, shared by a store across threads
+#
+# The video cache, quota ledger, playlist checkpoints and view history each
+# hold one connection to the same file, and the CLI and refresher may have
+# it open from other processes. Write-ahead logging lets readers run
+# alongside a writer, and the busy timeout makes concurrent writers wait
+# for each other instead of failing.
+def connect(path=DEFAULT_CACHE_PATH):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+# Persistent cache of the video dicts built by get_video_details, keyed by video ID
+class VideoCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, static_ttl=STATIC_TTL, volatile_ttl=VOLATILE_TTL):
+        self.path = path
+        self.static_ttl = static_ttl
+        self.volatile_ttl = volatile_ttl
+
+        # One connection is shared by every Streamlit session in the process
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(SCHEMA)
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.not_modified = 0
+
+    # Split video IDs into fresh entries and the IDs that need a refetch
+    #
+    # Returns (fresh, stale_stats, stale_static) where fresh maps IDs to cached
+    # video dicts, stale_stats lists cached IDs whose view count expired and
+    # stale_static lists IDs that need a full refetch (expired or not cached).
+    def lookup(self, video_ids, now=None):
+        now = time.time() if now is None else now
+        rows = {}
+
+        with self._lock:
+            for i in range(0, len(video_ids), SQL_BATCH_SIZE):
+                batch = video_ids[i:i + SQL_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                cursor = self._conn.execute(
+                    f"SELECT id, data, static_fetched_at, stats_fetched_at FROM videos WHERE id IN ({placeholders})",
+                    batch
+                )
+                for video_id, data, static_at, stats_at in cursor:
+                    rows[video_id] = (data, static_at, stats_at)
+
+        fresh = {}
+        stale_stats = []
+        stale_static = []
+
+        for video_id in video_ids:
+            row = rows.get(video_id)
+            if row is None:
+                self.misses += 1
+                stale_static.append(video_id)
+                continue
+
+            data, static_at, stats_at = row
+            if now - static_at > self.static_ttl:
+                self.stale += 1
+                stale_static.append(video_id)
+            elif now - stats_at > self.volatile_ttl:
+                self.stale += 1
+                stale_stats.append(video_id)
+            else:
+                self.hits += 1
+                fresh[video_id] = json.loads(data)
+
+        return fresh, stale_stats, stale_static
+
+    # Return cached video dicts regardless of their age
+    def get_many(self, video_ids):
+        result = {}
+        with self._lock:
+            for i in range(0, len(video_ids), SQL_BATCH_SIZE):
+                batch = video_ids[i:i + SQL_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                cursor = self._conn.execute(
+                    f"SELECT id, data FROM videos WHERE id IN ({placeholders})",
+                    batch
+                )
+                for video_id, data in cursor:
+                    result[video_id] = json.loads(data)
+        return result
+
+    # Store freshly fetched video dicts
+    #
+    # With static=False only the volatile fields were refetched, so the static
+    # timestamp of the existing entry is kept.
+    def store(self, videos, static=True, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            for video in videos:
+                data = json.dumps(video)
+                if static:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO videos (id, data, static_fetched_at, stats_fetched_at) VALUES (?, ?, ?, ?)",
+                        (video['id'], data, now, now)
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE videos SET data = ?, stats_fetched_at = ? WHERE id = ?",
+                        (data, now, video['id'])
+                    )
+
+    # Mark cached entries as fresh after the API answered 304 Not Modified
+    def touch(self, video_ids, static=True, now=None):
+        now = time.time() if now is None else now
+        self.not_modified += len(video_ids)
+        with self._lock, self._conn:
+            for video_id in video_ids:
+                if static:
+                    self._conn.execute(
+                        "UPDATE videos SET static_fetched_at = ?, stats_fetched_at = ? WHERE id = ?",
+                        (now, now, video_id)
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE videos SET stats_fetched_at = ? WHERE id = ?",
+                        (now, video_id)
+                    )
+
+    # ETag of the last videos.list response for exactly this request
+    def get_etag(self, request_key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag FROM list_etags WHERE request_key = ?", (request_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_etag(self, request_key, etag, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO list_etags (request_key, etag, fetched_at) VALUES (?, ?, ?)",
+                (request_key, etag, now)
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM videos")
+            self._conn.execute("DELETE FROM list_etags")
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.stale
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'not_modified': self.not_modified,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+# Key identifying a videos.list request so its ETag can be replayed
+def request_key(part, video_ids):
+    return f"{part}:{','.join(video_ids)}"
+
+
+# One cache per database file, shared across Streamlit reruns and sessions
+@lru_cache(maxsize=None)
+def get_video_cache(path=DEFAULT_CACHE_PATH):
+    return VideoCache(path)
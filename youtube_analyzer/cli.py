@@ -0,0 +1,380 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from itertools import islice
+
+from youtube_analyzer.analysis import tokenize_videos
+from youtube_analyzer.cache import DEFAULT_CACHE_PATH, get_video_cache
+from youtube_analyzer.diagnostics import Recorder, recording, to_json, to_prometheus
+from youtube_analyzer.parallel import DEFAULT_WORKERS
+from youtube_analyzer.phrases import PhraseCounter
+from youtube_analyzer.sketch import (
+    DEFAULT_COUNT_ERROR, DEFAULT_DISTINCT_ERROR, TermSketch, dump_sketches, load_sketches
+)
+from youtube_analyzer.quota import DEFAULT_DAILY_BUDGET, DEFAULT_RUN_BUDGET, QuotaScheduler, get_quota_ledger
+from youtube_analyzer.sources import expand_sources, get_playlist_checkpoints
+from youtube_analyzer.videos import DEFAULT_BATCH_SIZE, batched, get_video_details
+
+# Output table name of each analyzed field
+TERM_TABLES = {
+    'title': 'title_terms',
+    'tag': 'tag_terms',
+    'desc': 'desc_terms'
+}
+
+# Output table name and video text of each mined phrase table
+PHRASE_TABLES = {
+    'title_phrases': 'title',
+    'desc_phrases': 'description'
+}
+
+VIDEO_URL_TEMPLATE = "https://www.youtube.com/watch?v={}"
+
+
+# Non-empty lines of the input files, read lazily; '-' is stdin
+def read_urls(paths):
+    for path in paths:
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        try:
+            for line in stream:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+# One JSON object per line
+class JsonlWriter:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False))
+            self._file.write('\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# One Parquet row group per write call, so rows never pile up in memory
+class ParquetWriter:
+    def __init__(self, path, schema):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.schema = schema
+        self._writer = pq.ParquetWriter(path, schema)
+
+    def write(self, rows):
+        import pyarrow as pa
+
+        if rows:
+            self._writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+# Column types of the Parquet outputs, keyed by table name
+def parquet_schemas():
+    import pyarrow as pa
+
+    term_schema = pa.schema([('word', pa.string()), ('count', pa.int64()), ('total_videos', pa.int64())])
+    phrase_schema = pa.schema([('phrase', pa.string()), ('count', pa.int64()), ('total_videos', pa.int64())])
+    return {
+        'videos': pa.schema([
+            ('id', pa.string()),
+            ('url', pa.string()),
+            ('title', pa.string()),
+            ('description', pa.string()),
+            ('tags', pa.list_(pa.string())),
+            ('thumbnail', pa.string()),
+            ('view_count', pa.int64()),
+            ('published_at', pa.string())
+        ]),
+        'unresolved': pa.schema([('input', pa.string()), ('reason', pa.string())]),
+        **{name: term_schema for name in TERM_TABLES.values()},
+        **{name: phrase_schema for name in PHRASE_TABLES}
+    }
+
+
+def open_writer(output_dir, name, output_format):
+    if output_format == 'parquet':
+        return ParquetWriter(os.path.join(output_dir, f"{name}.parquet"), parquet_schemas()[name])
+    return JsonlWriter(os.path.join(output_dir, f"{name}.jsonl"))
+
+
+# Running document frequencies of title words, tags and description words
+#
+# Each video adds its distinct terms and is then dropped, so memory grows
+# with the vocabulary, not with the number of videos. Ties keep the order in
+# which terms were first seen, like the tables of the app. Phrases are
+# counted in bounded memory, see PhraseCounter; their counts are lower
+# bounds once rare phrases have been pruned.
+#
+# With sketches (field -> TermSketch) the terms are counted approximately in
+# fixed memory instead, for sweeps whose vocabulary does not fit; sketches
+# loaded from earlier runs are merged in the same way.
+class TermCounter:
+    def __init__(self, sketches=None):
+        self.total_videos = 0
+        self.counts = {field: Counter() for field in TERM_TABLES}
+        self.sketches = sketches
+        self.phrases = {name: PhraseCounter() for name in PHRASE_TABLES}
+
+    def add(self, videos, workers=None):
+        for video, tokens in zip(videos, tokenize_videos(videos, workers)):
+            self.total_videos += 1
+            for field, words in zip(TERM_TABLES, tokens):
+                if self.sketches is None:
+                    self.counts[field].update(dict.fromkeys(words, 1))
+                else:
+                    self.sketches[field].add(video['id'], words)
+            for name, key in PHRASE_TABLES.items():
+                self.phrases[name].add([video[key]])
+
+    # Rows of one field: terms found in at least min_count videos, most frequent first
+    def table(self, field, min_count=2, top_n=None):
+        if self.sketches is not None:
+            sketch = self.sketches[field]
+            total_videos = sketch.video_count()
+            return [
+                {'word': word, 'count': count, 'total_videos': total_videos}
+                for word, count, _ in sketch.top(min_count, top_n)
+            ]
+        rows = (
+            {'word': word, 'count': count, 'total_videos': self.total_videos}
+            for word, count in self.counts[field].most_common()
+            if count >= min_count
+        )
+        return list(islice(rows, top_n))
+
+    # Rows of one phrase table, like table
+    def phrase_table(self, name, min_count=2, top_n=None):
+        counter = self.phrases[name]
+        return [
+            {'phrase': phrase, 'count': count, 'total_videos': self.total_videos}
+            for phrase, count in counter.top(len(counter) if top_n is None else top_n, min_count)
+        ]
+
+
+def video_record(video):
+    return {
+        'id': video['id'],
+        'url': VIDEO_URL_TEMPLATE.format(video['id']),
+        'title': video['title'],
+        'description': video['description'],
+        'tags': list(video.get('tags', [])),
+        'thumbnail': video.get('thumbnail', ''),
+        'view_count': video.get('view_count', 0),
+        'published_at': video.get('published_at', '')
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m youtube_analyzer',
+        description="Analyze the titles, tags and descriptions of a list of YouTube videos."
+    )
+    parser.add_argument('inputs', nargs='*', default=['-'],
+                        help="files with one video, playlist or channel URL per line, '-' for stdin (default)")
+    parser.add_argument('-o', '--output-dir', default='.', help="directory for the output files")
+    parser.add_argument('-f', '--format', choices=('jsonl', 'parquet'), default='jsonl', dest='output_format')
+    parser.add_argument('--api-key', default=os.environ.get('YOUTUBE_API_KEY'),
+                        help="YouTube Data API key, defaults to $YOUTUBE_API_KEY")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="videos fetched per batch")
+    parser.add_argument('--max-videos', type=int, default=None,
+                        help="videos taken from each playlist or channel, all by default")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="tokenizer processes for large batches, 0 for one per core (default: %(default)s)")
+    parser.add_argument('--min-count', type=int, default=2, help="minimum number of videos sharing a term")
+    parser.add_argument('--top-n', type=int, default=None, help="keep only the most frequent terms per table")
+    parser.add_argument('--approximate', action='store_true',
+                        help="count terms in fixed memory with mergeable sketches instead of exactly")
+    parser.add_argument('--count-error', type=float, default=DEFAULT_COUNT_ERROR,
+                        help="approximate counts overstate by at most this share of all term occurrences "
+                             "(default: %(default)s)")
+    parser.add_argument('--distinct-error', type=float, default=DEFAULT_DISTINCT_ERROR,
+                        help="relative standard error of the distinct videos per term (default: %(default)s)")
+    parser.add_argument('--save-sketch', help="write the term sketches to this file, implies --approximate")
+    parser.add_argument('--merge-sketch', action='append', default=[],
+                        help="merge the term sketches of an earlier run or shard, implies --approximate; repeatable")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="SQLite file of the video cache and quota ledger")
+    parser.add_argument('--run-budget', type=int, default=DEFAULT_RUN_BUDGET, help="quota units this run may spend")
+    parser.add_argument('--daily-budget', type=int, default=DEFAULT_DAILY_BUDGET, help="quota units per Pacific day")
+    parser.add_argument('--metrics', help="write stage timings and API usage to this file, "
+                                          "Prometheus text if it ends in .prom, JSON otherwise")
+    parser.add_argument('--profile', action='store_true', help="run under cProfile and report the slowest functions")
+    parser.add_argument('-q', '--quiet', action='store_true', help="do not report progress on stderr")
+
+    args = parser.parse_args(argv)
+    if not args.api_key:
+        parser.error("an API key is required, pass --api-key or set YOUTUBE_API_KEY")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be positive")
+    if args.workers < 0:
+        parser.error("--workers must not be negative")
+    if args.max_videos is not None and args.max_videos < 1:
+        parser.error("--max-videos must be positive")
+    if not 0 < args.count_error < 1 or not 0 < args.distinct_error < 1:
+        parser.error("--count-error and --distinct-error must be between 0 and 1")
+    args.approximate = args.approximate or bool(args.save_sketch or args.merge_sketch)
+    return args
+
+
+# Empty term sketches for a run, or the merge of the sketch files given; the
+# files decide the sketch parameters then, as all sketches must share them
+def open_sketches(args):
+    if not args.approximate:
+        return None
+    sketches = None
+    for path in args.merge_sketch:
+        loaded = load_sketches(path)
+        if sketches is None:
+            sketches = loaded
+        else:
+            sketches = {field: sketches[field].merge(loaded[field]) for field in TERM_TABLES}
+    if sketches is None:
+        sketches = {
+            field: TermSketch(count_error=args.count_error, distinct_error=args.distinct_error)
+            for field in TERM_TABLES
+        }
+    return sketches
+
+
+def report(message, quiet):
+    if not quiet:
+        print(message, file=sys.stderr, flush=True)
+
+
+# Fetch, record and count every video of the input, one batch at a time
+#
+# Video records and unresolved inputs are written as each batch completes;
+# the term tables are written once the input is exhausted. Returns the exit
+# status: 1 when some videos or playlists could not be fetched, 2 when the
+# sketches to merge can not be read, 0 otherwise.
+# Playlist listings are checkpointed in the cache database, so rerunning an
+# interrupted run resumes them instead of paying for their pages again.
+def run(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    cache = get_video_cache(args.cache)
+    scheduler = QuotaScheduler(
+        run_budget=args.run_budget,
+        daily_budget=args.daily_budget,
+        ledger=get_quota_ledger(args.cache)
+    )
+    try:
+        terms = TermCounter(open_sketches(args))
+    except (OSError, ValueError, KeyError) as e:
+        report(f"error: could not read the sketches to merge: {e}", False)
+        return 2
+
+    videos_writer = open_writer(args.output_dir, 'videos', args.output_format)
+    unresolved_writer = open_writer(args.output_dir, 'unresolved', args.output_format)
+    # Inputs that never became video IDs, written out with the next batch
+    unresolved = []
+    resolved = failed = missing = invalid = unlisted = 0
+    errors = set()
+    start = time.perf_counter()
+
+    def on_invalid(url):
+        nonlocal invalid
+        invalid += 1
+        unresolved.append({'input': url, 'reason': 'invalid_url'})
+
+    def on_error(url, message):
+        nonlocal unlisted
+        unlisted += 1
+        unresolved.append({'input': url, 'reason': 'listing_failed'})
+        report(f"error: could not list {url}: {message}", args.quiet)
+
+    try:
+        video_ids = expand_sources(
+            read_urls(args.inputs), args.api_key, scheduler,
+            checkpoints=get_playlist_checkpoints(args.cache),
+            max_videos=args.max_videos,
+            on_invalid=on_invalid,
+            on_error=on_error
+        )
+        for batch in batched(video_ids, args.batch_size):
+            result = get_video_details(args.api_key, batch, cache=cache, scheduler=scheduler)
+
+            terms.add(result['videos'], args.workers)
+            videos_writer.write([video_record(video) for video in result['videos']])
+            unresolved_writer.write(
+                unresolved
+                + [{'input': video_id, 'reason': 'missing'} for video_id in result['missing_ids']]
+                + [{'input': video_id, 'reason': 'failed'} for video_id in result['failed_ids']]
+            )
+            unresolved.clear()
+
+            resolved += len(result['videos'])
+            missing += len(result['missing_ids'])
+            failed += len(result['failed_ids'])
+            # Each distinct API error is reported once
+            for error in result['errors']:
+                if error not in errors:
+                    errors.add(error)
+                    report(f"error: {error}", args.quiet)
+
+            elapsed = time.perf_counter() - start
+            report(
+                f"{resolved} videos, {missing} missing, {failed} failed, {invalid} invalid URLs"
+                f" | {resolved / elapsed:,.0f} videos/s | {scheduler.units_used} quota units",
+                args.quiet
+            )
+
+        # Inputs rejected after the last batch
+        unresolved_writer.write(unresolved)
+    finally:
+        videos_writer.close()
+        unresolved_writer.close()
+
+    for field, name in TERM_TABLES.items():
+        writer = open_writer(args.output_dir, name, args.output_format)
+        try:
+            writer.write(terms.table(field, args.min_count, args.top_n))
+        finally:
+            writer.close()
+    for name in PHRASE_TABLES:
+        writer = open_writer(args.output_dir, name, args.output_format)
+        try:
+            writer.write(terms.phrase_table(name, args.min_count, args.top_n))
+        finally:
+            writer.close()
+
+    if args.save_sketch:
+        dump_sketches(args.save_sketch, terms.sketches)
+
+    report(f"done: {resolved} videos in {time.perf_counter() - start:.1f}s, output in {args.output_dir}", args.quiet)
+    return 1 if failed or unlisted else 0
+
+
+# Run with diagnostics recorded, writing them out even if the run fails
+def run_instrumented(args):
+    recorder = Recorder(profile=args.profile)
+    try:
+        with recording(recorder):
+            return run(args)
+    finally:
+        snapshot = recorder.snapshot()
+        if args.metrics:
+            with open(args.metrics, 'w', encoding='utf-8') as file:
+                file.write(to_prometheus(snapshot) if args.metrics.endswith('.prom') else to_json(snapshot))
+        elif snapshot['profile']:
+            print(snapshot['profile'], file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.metrics or args.profile:
+        return run_instrumented(args)
+    return run(args)
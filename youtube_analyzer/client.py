@@ -0,0 +1,97 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from youtube_analyzer.diagnostics import current_recorder
+
+# Upper bound on API requests running concurrently, across all API keys
+MAX_FETCH_WORKERS = 4
+
+# Seconds before a single API request is abandoned
+HTTP_TIMEOUT = 30
+
+
+# YouTube Data API client that is built once per API key and reused
+#
+# googleapiclient and httplib2 are imported lazily so the first page paint
+# does not wait for them. httplib2.Http objects are not thread-safe, so each
+# worker thread of the shared executor keeps its own Http object per client;
+# its keep-alive connections are reused by every request that thread
+# executes for the client.
+class YouTubeClient:
+    def __init__(self, api_key, timeout=HTTP_TIMEOUT):
+        from googleapiclient.discovery import build
+
+        # The discovery document ships with googleapiclient, so building the
+        # service does not hit the network
+        self.service = build(
+            'youtube', 'v3',
+            developerKey=api_key,
+            static_discovery=True,
+            cache_discovery=False
+        )
+        self.timeout = timeout
+        self.executor = get_fetch_executor()
+        self._local = threading.local()
+
+    # Http object owned by the calling thread
+    def http(self):
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            from googleapiclient.http import build_http
+
+            http = build_http()
+            http.timeout = self.timeout
+            self._local.http = http
+        return http
+
+    def execute(self, request):
+        recorder = current_recorder()
+        if recorder is None:
+            return request.execute(http=self.http())
+
+        # Count the raw response body before it is parsed; 304 responses
+        # raise before postproc and have no body
+        postproc = request.postproc
+
+        def counted(resp, content):
+            recorder.count('api_bytes_received', len(content))
+            return postproc(resp, content)
+
+        request.postproc = counted
+        try:
+            with recorder.stage('api_request'):
+                return request.execute(http=self.http())
+        finally:
+            request.postproc = postproc
+
+    # Execute requests on the worker pool, returning futures in request order
+    #
+    # With a scheduler every call is charged against its quota budget and
+    # retried on rate limits and server errors.
+    #
+    # While diagnostics are recorded each call runs in a copy of the caller's
+    # context, so the worker thread reports to the caller's recorder.
+    def submit_all(self, requests, scheduler=None, method='videos.list'):
+        submit = self.executor.submit
+        if current_recorder() is not None:
+            def submit(function, *args):
+                return self.executor.submit(contextvars.copy_context().run, function, *args)
+
+        if scheduler is None:
+            return [submit(self.execute, request) for request in requests]
+        return [submit(scheduler.execute, self.execute, request, method) for request in requests]
+
+
+# Worker threads shared by the clients of every API key, so a client
+# evicted from get_youtube_client leaves no threads behind
+@lru_cache(maxsize=None)
+def get_fetch_executor():
+    return ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS, thread_name_prefix='youtube-api')
+
+
+# One client per API key, shared across Streamlit reruns and sessions
+@lru_cache(maxsize=8)
+def get_youtube_client(api_key):
+    return YouTubeClient(api_key)
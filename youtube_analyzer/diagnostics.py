@@ -0,0 +1,211 @@
+import contextvars
+import functools
+import io
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+from youtube_analyzer.memo import memo_stats
+
+# Recorder of the run in progress, None while instrumentation is off
+_CURRENT = contextvars.ContextVar('diagnostics_recorder', default=None)
+
+# Returned by stage() while nothing is recorded, so an instrumented call
+# costs one context variable lookup
+_NO_STAGE = nullcontext()
+
+# Functions listed in a cProfile capture
+PROFILE_LINES = 40
+
+# Prefix of every Prometheus metric name
+METRIC_PREFIX = 'youtube_analyzer'
+
+
+# Wall time of one stage, added to its recorder on exit
+class _Stage:
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+# Timings and counters of one run: an app rerun or a CLI invocation
+#
+# Stage times are inclusive, a stage running inside another (tokenize_text
+# inside analyze_words) counts toward both. Stages that run on the API
+# worker threads add up the time of every thread, so they can exceed the
+# wall time of the run. Memo cache hits are the difference between the
+# process-wide counters at the start and the end of the run, so they
+# include other sessions running at the same time.
+class Recorder:
+    def __init__(self, profile=False):
+        self.profile = profile
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._memo_start = memo_stats()
+        self.wall_seconds = None
+        self.memo = {}
+        self.profile_text = None
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = [0, 0.0]
+            stats[0] += 1
+            stats[1] += seconds
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self._start
+        self.memo = {
+            name: {
+                'hits': stats['hits'] - self._memo_start.get(name, {}).get('hits', 0),
+                'misses': stats['misses'] - self._memo_start.get(name, {}).get('misses', 0)
+            }
+            for name, stats in memo_stats().items()
+        }
+
+    # Plain-data summary of the run, see to_json and to_prometheus
+    def snapshot(self):
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(),
+                'wall_seconds': self.wall_seconds,
+                'stages': {
+                    name: {'calls': calls, 'seconds': seconds}
+                    for name, (calls, seconds) in sorted(self.stages.items())
+                },
+                'counters': dict(sorted(self.counters.items())),
+                'memo': self.memo,
+                'profile': self.profile_text
+            }
+
+
+# Context manager timing a stage of the current run, if one is recorded
+def stage(name):
+    recorder = _CURRENT.get()
+    if recorder is None:
+        return _NO_STAGE
+    return _Stage(recorder, name)
+
+
+# Decorator timing every call of a function as a stage
+def timed(name):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            recorder = _CURRENT.get()
+            if recorder is None:
+                return function(*args, **kwargs)
+            with _Stage(recorder, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Add to a counter of the current run, if one is recorded
+def count(name, amount=1):
+    recorder = _CURRENT.get()
+    if recorder is not None:
+        recorder.count(name, amount)
+
+
+def current_recorder():
+    return _CURRENT.get()
+
+
+# Record every instrumented stage that runs inside the block
+#
+# Threads only see the recorder when they run in a copy of the caller's
+# context, like the API calls of YouTubeClient.submit_all. With
+# recorder.profile the block also runs under cProfile; Python allows one
+# profiler at a time, so a capture that can not start is reported in the
+# snapshot instead of failing the run.
+@contextmanager
+def recording(recorder):
+    token = _CURRENT.set(recorder)
+    profiler = None
+    if recorder.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            profiler = None
+            recorder.profile_text = f"Profiling unavailable: {e}"
+    try:
+        yield recorder
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            recorder.profile_text = profile_summary(profiler)
+        _CURRENT.reset(token)
+        recorder.finish()
+
+
+# Most expensive functions of a profile by cumulative time, as text
+def profile_summary(profiler, lines=PROFILE_LINES):
+    import pstats
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(lines)
+    return output.getvalue()
+
+
+def to_json(snapshot):
+    return json.dumps(snapshot, indent=2)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Prometheus text exposition of a snapshot
+def to_prometheus(snapshot):
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        full_name = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{_label(label)}"' for key, label in labels.items())
+            lines.append(f"{full_name}{{{label_text}}} {value}" if label_text else f"{full_name} {value}")
+
+    if snapshot['wall_seconds'] is not None:
+        metric('run_seconds', 'gauge', "Wall time of the run.", [({}, snapshot['wall_seconds'])])
+    stages = snapshot['stages'].items()
+    metric('stage_seconds_total', 'counter', "Time spent in each stage, inclusive of nested stages.",
+           [({'stage': name}, stats['seconds']) for name, stats in stages])
+    metric('stage_calls_total', 'counter', "Calls of each stage.",
+           [({'stage': name}, stats['calls']) for name, stats in stages])
+    for name, value in snapshot['counters'].items():
+        metric(f"{name}_total", 'counter', f"Total {name.replace('_', ' ')} in the run.", [({}, value)])
+    memo = snapshot['memo'].items()
+    metric('memo_hits_total', 'counter', "Memo cache hits in the run.",
+           [({'cache': name}, stats['hits']) for name, stats in memo])
+    metric('memo_misses_total', 'counter', "Memo cache misses in the run.",
+           [({'cache': name}, stats['misses']) for name, stats in memo])
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,195 @@
+import csv
+import io
+import tempfile
+import zipfile
+from itertools import islice
+
+from youtube_analyzer.diagnostics import stage
+from youtube_analyzer.frequency import VIDEO_URL_TEMPLATE, video_urls
+from youtube_analyzer.memo import LRUCache
+
+# Report formats: file extension and MIME type of the download
+EXPORT_FORMATS = {
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('zip', 'application/zip'),
+    'parquet': ('zip', 'application/zip')
+}
+
+# Fields of an analysis and the report table of their frequencies
+FREQUENCY_TABLES = (
+    ('title_analysis', 'Title words'),
+    ('tag_analysis', 'Tags'),
+    ('desc_analysis', 'Description words')
+)
+
+# Short field names used in the highlights table
+FIELD_LABELS = {
+    'title_analysis': 'title',
+    'tag_analysis': 'tags',
+    'desc_analysis': 'description'
+}
+
+# Excel rejects longer cell values
+XLSX_MAX_CELL_LENGTH = 32767
+
+# Rows buffered per Parquet row group
+PARQUET_BATCH_SIZE = 10_000
+
+# Temporary reports spill from memory to disk beyond this size
+SPOOL_SIZE = 16 * 1024 * 1024
+
+# Finished reports of recent analyses, bounded by their size in bytes
+EXPORT_CACHE_SIZE = 64 * 1024 * 1024
+EXPORT_CACHE = LRUCache('export', EXPORT_CACHE_SIZE, weight=len)
+
+
+# Words shared by at least min_count videos, most frequent first
+def frequency_rows(index, min_count=2):
+    urls = video_urls(index)
+    for term_id in index.term_ids_shared_by(min_count):
+        yield (
+            index.terms[term_id],
+            int(index.document_frequency[term_id]),
+            ", ".join(urls[index.positions_of(term_id)])
+        )
+
+
+def video_rows(videos_data):
+    for number, video in enumerate(videos_data, start=1):
+        yield (
+            number,
+            video['id'],
+            VIDEO_URL_TEMPLATE.format(video['id']),
+            video['title'],
+            video.get('published_at', ''),
+            video.get('view_count', 0),
+            ", ".join(video.get('tags', [])),
+            video['description']
+        )
+
+
+# What the app highlights: for each video and field, the words it shares
+# with other videos and how many other videos have them
+#
+# Listing the other videos themselves would grow with the square of the
+# number of videos sharing a word; the frequency tables already list them.
+def highlight_rows(analysis_results):
+    video_ids = analysis_results['title_analysis']['word_count'].video_ids
+    indexes = [(label, analysis_results[field]['word_count']) for field, label in FIELD_LABELS.items()]
+    for position, video_id in enumerate(video_ids):
+        for label, index in indexes:
+            term_ids = index.terms_at(position)
+            others = index.document_frequency[term_ids] - 1
+            shared = others > 0
+            if shared.any():
+                yield (position + 1, video_id, label, ", ".join(
+                    f"{index.terms[term_id]} ({count})"
+                    for term_id, count in zip(term_ids[shared].tolist(), others[shared].tolist())
+                ))
+
+
+# (name, header, rows) of every table of the report; rows are generators,
+# so no table is materialized before it is written
+def report_tables(videos_data, analysis_results):
+    tables = [
+        (name, ('Word', 'Frequency', 'Videos'), frequency_rows(analysis_results[field]['word_count']))
+        for field, name in FREQUENCY_TABLES
+    ]
+    tables.append((
+        'Videos',
+        ('#', 'Video ID', 'URL', 'Title', 'Published', 'Views', 'Tags', 'Description'),
+        video_rows(videos_data)
+    ))
+    tables.append((
+        'Highlights',
+        ('#', 'Video ID', 'Field', 'Shared words (other videos)'),
+        highlight_rows(analysis_results)
+    ))
+    return tables
+
+
+# One worksheet per table with xlsxwriter's constant-memory mode: each row is
+# flushed to a temporary file as soon as the next one starts, so memory does
+# not grow with the number of rows
+def write_xlsx(target, tables, constant_memory=True):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(target, {
+        'constant_memory': constant_memory,
+        # Cells are plain text: no URL, formula or number conversion
+        'strings_to_urls': False,
+        'strings_to_formulas': False,
+        'strings_to_numbers': False
+    })
+    bold = workbook.add_format({'bold': True})
+    try:
+        for name, header, rows in tables:
+            worksheet = workbook.add_worksheet(name)
+            worksheet.write_row(0, 0, header, bold)
+            for row_number, row in enumerate(rows, start=1):
+                worksheet.write_row(row_number, 0, [
+                    value[:XLSX_MAX_CELL_LENGTH] if isinstance(value, str) else value
+                    for value in row
+                ])
+    finally:
+        workbook.close()
+
+
+# A zip archive with one UTF-8 CSV per table, written row by row
+def write_csv(target, tables):
+    with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, header, rows in tables:
+            with archive.open(f"{name}.csv", 'w') as member:
+                # The BOM lets Excel detect the encoding
+                text = io.TextIOWrapper(member, encoding='utf-8-sig', newline='')
+                writer = csv.writer(text)
+                writer.writerow(header)
+                writer.writerows(rows)
+                text.flush()
+                text.detach()
+
+
+# A zip archive with one Parquet file per table, one row group per batch
+def write_parquet(target, tables):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with zipfile.ZipFile(target, 'w') as archive:
+        for name, header, rows in tables:
+            with archive.open(f"{name}.parquet", 'w') as member:
+                writer = None
+                while batch := list(islice(rows, PARQUET_BATCH_SIZE)):
+                    table = pa.Table.from_pydict(dict(zip(header, zip(*batch))))
+                    if writer is None:
+                        writer = pq.ParquetWriter(member, table.schema)
+                    writer.write_table(table)
+                if writer is None:
+                    # Empty table: header only
+                    writer = pq.ParquetWriter(member, pa.schema([(column, pa.string()) for column in header]))
+                writer.close()
+
+
+WRITERS = {
+    'xlsx': write_xlsx,
+    'csv': write_csv,
+    'parquet': write_parquet
+}
+
+
+# Write the report of an analysis to a binary file object or path
+def write_report(target, output_format, videos_data, analysis_results):
+    WRITERS[output_format](target, report_tables(videos_data, analysis_results))
+
+
+# The report as bytes, built once per analysis and format
+#
+# The writer streams into a temporary file that only spills to disk for
+# large reports; the finished file is read back once for the download.
+def export_report(analysis_key, output_format, videos_data, analysis_results):
+    def build():
+        with stage('export_report'), tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as target:
+            write_report(target, output_format, videos_data, analysis_results)
+            target.seek(0)
+            return target.read()
+
+    return EXPORT_CACHE.get_or_compute((analysis_key, output_format), build)
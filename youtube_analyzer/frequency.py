@@ -0,0 +1,70 @@
+from youtube_analyzer.diagnostics import timed
+from youtube_analyzer.memo import LRUCache
+
+VIDEO_URL_TEMPLATE = "https://www.youtube.com/watch?v={}"
+
+# Frequency tables of recent analyses, bounded by their total number of rows
+FREQUENCY_CACHE_SIZE = 200_000
+FREQUENCY_CACHE = LRUCache('frequency', FREQUENCY_CACHE_SIZE, weight=lambda df: len(df) + 1)
+
+
+# Watch URL of every video in the index, in video position order
+def video_urls(index):
+    import numpy as np
+
+    return np.array([VIDEO_URL_TEMPLATE.format(video_id) for video_id in index.video_ids], dtype=object)
+
+
+# Term IDs to report: shared by at least min_count videos, most frequent
+# first, cut to top_n before anything is materialized
+def _selected_term_ids(index, min_count, top_n):
+    term_ids = index.term_ids_shared_by(min_count)
+    if top_n is not None:
+        term_ids = term_ids[:top_n]
+    return term_ids
+
+
+# Create a DataFrame for word frequencies
+#
+# word_count is the TermIndex of one field and total_videos the size of the
+# analyzed set. Only words found in at least min_count videos are included
+# (more than one video by default), optionally cut to the top_n most
+# frequent. Counts, the sort order and the URL strings come from the index
+# arrays, so no video list is scanned per word.
+#
+# url_lists optionally maps terms to their joined "Videos" text from an
+# earlier call; missing entries are built and added, so after a small change
+# to the video set only the terms the caller dropped from it are rejoined.
+@timed('create_word_frequency_df')
+def create_word_frequency_df(word_count, total_videos, min_count=2, top_n=None, url_lists=None):
+    import pandas as pd
+
+    term_ids = _selected_term_ids(word_count, min_count, top_n)
+    if len(term_ids) == 0:
+        return pd.DataFrame()
+
+    counts = word_count.document_frequency[term_ids]
+    terms = word_count.terms
+    url_lists = {} if url_lists is None else url_lists
+    urls = None
+
+    videos_column = []
+    for term_id in term_ids:
+        term = terms[term_id]
+        joined = url_lists.get(term)
+        if joined is None:
+            if urls is None:
+                urls = video_urls(word_count)
+            joined = url_lists[term] = ", ".join(urls[word_count.positions_of(term_id)])
+        videos_column.append(joined)
+
+    df = pd.DataFrame({
+        'Word': [terms[term_id] for term_id in term_ids],
+        'Frequency': pd.Series(counts).astype(str) + f" out of {total_videos}",
+        'Videos': videos_column
+    })
+    # Index starts from 1 instead of 0
+    df.index = pd.RangeIndex(1, len(df) + 1)
+
+    return df
+
@@ -0,0 +1,153 @@
+import re
+from collections.abc import Mapping
+
+from youtube_analyzer.memo import LRUCache
+
+# Runs of word characters; every highlighted term starts at one
+WORD_RE = re.compile(r'\w+')
+
+# Inline style of a highlighted word
+HIGHLIGHT_TEMPLATE = "<span style='color: #006400; font-weight: bold;' title='Also in: {videos}'>{text}</span>"
+
+# Rendered HTML fragments (a string or a tuple of paragraph strings),
+# bounded by their total length in characters
+HTML_CACHE_SIZE = 16_000_000
+
+
+def html_length(fragment):
+    if isinstance(fragment, str):
+        return len(fragment)
+    return sum(len(part) for part in fragment if part)
+
+
+HTML_CACHE = LRUCache('html', HTML_CACHE_SIZE, weight=html_length)
+
+
+# Whole-word, case-insensitive highlighter over a fixed vocabulary
+#
+# Terms are indexed by their first word, longest first. Highlighting scans
+# the word runs of the text once, looks each up in that index and keeps the
+# longest term that matches at that position with a word boundary after it,
+# which is what matching every term separately with \bterm\b did, without
+# a regex per term. Output is built as a list of parts and joined once.
+class Highlighter:
+    def __init__(self, terms):
+        self._candidates = {}
+        for term in terms:
+            first_word = WORD_RE.match(term)
+            # Terms starting with punctuation can not start at a word boundary
+            if first_word is None:
+                continue
+            self._candidates.setdefault(first_word.group(), []).append(term)
+
+        for candidates in self._candidates.values():
+            candidates.sort(key=len, reverse=True)
+
+    # Longest term starting at `start`, or None
+    def _match(self, text, start, word):
+        candidates = self._candidates.get(word.lower())
+        if not candidates:
+            return None
+
+        for term in candidates:
+            end = start + len(term)
+            if text[start:end].lower() != term:
+                continue
+            # \b after the term: word-ness changes between its last character
+            # and the next one
+            next_is_word = end < len(text) and (text[end].isalnum() or text[end] == '_')
+            last_is_word = term[-1].isalnum() or term[-1] == '_'
+            if next_is_word != last_is_word:
+                return term
+        return None
+
+    # Wrap every known term in text with a span; labels maps term -> tooltip text
+    def highlight(self, text, labels):
+        parts = []
+        pos = 0
+        for word in WORD_RE.finditer(text):
+            start = word.start()
+            # Skip words covered by the previous multi-word match
+            if start < pos:
+                continue
+
+            term = self._match(text, start, word.group())
+            if term is None:
+                continue
+
+            end = start + len(term)
+            parts.append(text[pos:start])
+            parts.append(HIGHLIGHT_TEMPLATE.format(videos=labels[term], text=text[start:end]))
+            pos = end
+
+        if not parts:
+            return text
+        parts.append(text[pos:])
+        return ''.join(parts)
+
+
+# Which words are shared between videos, computed once per analysis
+#
+# The term index already knows, for every term, the positions of the videos
+# containing it. Terms found in more than one video get their "Also in"
+# labels built once, so rendering a video no longer rescans the whole
+# vocabulary and videos list for every word of every video.
+class HighlightMap:
+    def __init__(self, index):
+        self.index = index
+
+        # Per-term labels (1-based video numbers) of every video containing it
+        terms = index.terms
+        self.labels = {
+            terms[term_id]: [f"Video {pos + 1}" for pos in index.positions_of(term_id)]
+            for term_id in index.term_ids_shared_by(2)
+        }
+        self._highlighter = None
+
+    # One highlighter per field, compiled on first use
+    @property
+    def highlighter(self):
+        if self._highlighter is None:
+            self._highlighter = Highlighter(self.labels)
+        return self._highlighter
+
+    # Highlight map of one video: shared term -> "Video 2, Video 5"
+    def for_video(self, video_id):
+        position = self.index.video_positions.get(video_id)
+        own_label = None if position is None else f"Video {position + 1}"
+        return VideoHighlights(self.labels, own_label, self)
+
+
+# Read-only term -> "Also in" text for one video, excluding the video itself
+#
+# Lookups cost O(videos sharing the term) and are memoized, so rendering is
+# proportional to the tokens of the video instead of the whole vocabulary.
+class VideoHighlights(Mapping):
+    def __init__(self, labels, own_label, highlight_map=None):
+        self._labels = labels
+        self._own_label = own_label
+        self._highlight_map = highlight_map
+        self._texts = {}
+
+    # HTML of text with the words this video shares with others highlighted
+    def highlight(self, text):
+        if not self._labels:
+            return text
+        return self._highlight_map.highlighter.highlight(text, self)
+
+    def __getitem__(self, term):
+        text = self._texts.get(term)
+        if text is None:
+            text = self._texts[term] = ", ".join(
+                label for label in self._labels[term] if label != self._own_label
+            )
+        return text
+
+    def __contains__(self, term):
+        return term in self._labels
+
+    def __iter__(self):
+        return iter(self._labels)
+
+    def __len__(self):
+        return len(self._labels)
@@ -0,0 +1,195 @@
+import threading
+import time
+from functools import lru_cache
+
+from youtube_analyzer.cache import DEFAULT_CACHE_PATH, SQL_BATCH_SIZE, connect
+
+# Polling interval of a tracked video: halved while its views change by at
+# least CHANGE_THRESHOLD between polls, doubled while they do not
+MIN_INTERVAL = 15 * 60
+MAX_INTERVAL = 24 * 60 * 60
+INITIAL_INTERVAL = 60 * 60
+CHANGE_THRESHOLD = 0.01
+
+# One series per video: the first observation in full, every later one as
+# zigzag varint (seconds, views) deltas from the one before it, so a typical
+# observation takes 3 to 5 bytes. The last observation, the polling interval
+# and the last velocity are kept in columns for scheduling and display.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS view_series (
+    id TEXT PRIMARY KEY,
+    first_at INTEGER NOT NULL,
+    first_views INTEGER NOT NULL,
+    last_at INTEGER NOT NULL,
+    last_views INTEGER NOT NULL,
+    observations INTEGER NOT NULL,
+    deltas BLOB NOT NULL,
+    velocity REAL,
+    poll_interval REAL NOT NULL,
+    next_due REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS view_series_due ON view_series (next_due);
+"""
+
+
+# Zigzag varints of signed integers, as in Protocol Buffers
+def encode_deltas(values):
+    out = bytearray()
+    for value in values:
+        value = (value << 1) ^ (value >> 63)
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_deltas(data):
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append((value >> 1) ^ -(value & 1))
+            value = shift = 0
+    return values
+
+
+# Next polling interval after an observation changed the views by `change`
+def next_interval(interval, previous_views, change):
+    if abs(change) >= CHANGE_THRESHOLD * max(previous_views, 1):
+        return max(MIN_INTERVAL, interval / 2)
+    return min(MAX_INTERVAL, interval * 2)
+
+
+# View counts of tracked videos over time, in the cache database
+#
+# Every recorded observation extends the video's series; videos that are
+# due for a poll are handed out most overdue first, see due(). Velocities
+# are in views per hour between the last two observations.
+class ViewHistory:
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(SCHEMA)
+
+    # Record (video ID, views) observations taken at `now`
+    #
+    # Videos seen for the first time start to be tracked. An observation at
+    # or before a video's last one is ignored.
+    def record(self, observations, now=None):
+        at = int(time.time() if now is None else now)
+        observations = dict(observations)
+        with self._lock, self._conn:
+            rows = self._select(
+                "last_at, last_views, observations, deltas, poll_interval", list(observations)
+            )
+            inserts = []
+            updates = []
+            for video_id, views in observations.items():
+                row = rows.get(video_id)
+                if row is None:
+                    inserts.append((video_id, at, views, at, views, 1, b'', None, INITIAL_INTERVAL, at + INITIAL_INTERVAL))
+                    continue
+                last_at, last_views, count, deltas, interval = row
+                if at <= last_at:
+                    continue
+                change = views - last_views
+                interval = next_interval(interval, last_views, change)
+                updates.append((
+                    at, views, count + 1, deltas + encode_deltas((at - last_at, change)),
+                    change * 3600 / (at - last_at), interval, at + interval, video_id
+                ))
+            self._conn.executemany(
+                "INSERT INTO view_series (id, first_at, first_views, last_at, last_views, observations, deltas, "
+                "velocity, poll_interval, next_due) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                inserts
+            )
+            self._conn.executemany(
+                "UPDATE view_series SET last_at = ?, last_views = ?, observations = ?, deltas = ?, "
+                "velocity = ?, poll_interval = ?, next_due = ? WHERE id = ?",
+                updates
+            )
+
+    # Start tracking the videos of an analysis with the view counts they were
+    # fetched with; videos already tracked are left to the refresher
+    def track(self, videos, now=None):
+        observations = {video['id']: video.get('view_count', 0) for video in videos}
+        with self._lock:
+            tracked = self._select("last_at", list(observations))
+        self.record(((video_id, views) for video_id, views in observations.items() if video_id not in tracked), now)
+
+    # Push back the next poll of videos the API no longer returns
+    def postpone(self, video_ids, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE view_series SET poll_interval = ?, next_due = ? WHERE id = ?",
+                [(MAX_INTERVAL, now + MAX_INTERVAL, video_id) for video_id in video_ids]
+            )
+
+    # Up to `limit` IDs of videos due for a poll, most overdue first
+    def due(self, limit, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT id FROM view_series WHERE next_due <= ? ORDER BY next_due LIMIT ?", (now, limit)
+            )
+            return [video_id for video_id, in cursor]
+
+    # (unix time, views) observations of one video, oldest first
+    def series(self, video_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT first_at, first_views, deltas FROM view_series WHERE id = ?", (video_id,)
+            ).fetchone()
+        if row is None:
+            return []
+        at, views, deltas = row
+        points = [(at, views)]
+        values = decode_deltas(deltas)
+        for seconds, change in zip(values[::2], values[1::2]):
+            at += seconds
+            views += change
+            points.append((at, views))
+        return points
+
+    # Views per hour of each video with at least two observations
+    def velocities(self, video_ids):
+        with self._lock:
+            rows = self._select("velocity", list(video_ids))
+        return {video_id: velocity for video_id, (velocity,) in rows.items() if velocity is not None}
+
+    def stats(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tracked, due, observations, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(next_due <= ?), 0), COALESCE(SUM(observations), 0), "
+                "COALESCE(SUM(LENGTH(deltas)), 0) FROM view_series",
+                (now,)
+            ).fetchone()
+        return {'tracked': tracked, 'due': due, 'observations': observations, 'delta_bytes': size}
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM view_series")
+
+    # Rows of the given videos, keyed by ID; the caller holds the lock
+    def _select(self, columns, video_ids):
+        rows = {}
+        for i in range(0, len(video_ids), SQL_BATCH_SIZE):
+            batch = video_ids[i:i + SQL_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            cursor = self._conn.execute(f"SELECT id, {columns} FROM view_series WHERE id IN ({placeholders})", batch)
+            for video_id, *values in cursor:
+                rows[video_id] = tuple(values)
+        return rows
+
+
+# One history per database file, shared across Streamlit reruns and sessions
+@lru_cache(maxsize=None)
+def get_view_history(path=DEFAULT_CACHE_PATH):
+    return ViewHistory(path)
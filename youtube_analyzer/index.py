@@ -0,0 +1,164 @@
+from collections.abc import Mapping
+from itertools import chain
+
+
+# Inverted index of which videos contain which terms
+#
+# Terms and videos get integer IDs in order of first appearance. Occurrences
+# are stored twice as sparse CSR arrays: term -> sorted video positions and
+# video -> sorted term IDs, so "videos containing term", "terms shared by this
+# pair" and "terms shared by >= k videos" are array slices or vectorized
+# operations. Document frequency is the row length of the term matrix.
+#
+# Videos can be added and removed later with update(); only the words of the
+# added videos are read, the arrays are then rebuilt from the per-video term
+# ID lists in one vectorized pass.
+#
+# For compatibility the index is also a read-only mapping of
+# term -> (count, [video IDs]), the shape count_words_across_videos returned
+# before.
+class TermIndex(Mapping):
+    def __init__(self, words_per_video=None):
+        self.term_ids = {}
+        self.terms = []
+        # Distinct term IDs of each video in word order, in video order
+        self._doc_terms = {}
+        self.update(added=words_per_video)
+
+    # Add and remove videos, optionally reorder them, and rebuild the arrays
+    #
+    # added maps new video IDs to their words, removed lists video IDs to drop
+    # and order is the new video order. Term IDs are never reused: a term no
+    # video contains any more keeps its ID with a document frequency of 0.
+    def update(self, added=None, removed=(), order=None):
+        for video_id in removed:
+            del self._doc_terms[video_id]
+
+        # Each term is counted once per video
+        term_ids = self.term_ids
+        for video_id, words in (added or {}).items():
+            self._doc_terms[video_id] = list(dict.fromkeys(term_ids.setdefault(word, len(term_ids)) for word in words))
+        if len(self.terms) < len(term_ids):
+            self.terms = list(term_ids)
+
+        if order is not None:
+            self._doc_terms = {video_id: self._doc_terms[video_id] for video_id in order}
+        self._build()
+
+    def _build(self):
+        import numpy as np
+
+        doc_terms = list(self._doc_terms.values())
+        self.video_ids = list(self._doc_terms)
+        self.video_positions = {video_id: pos for pos, video_id in enumerate(self.video_ids)}
+
+        doc_lengths = np.fromiter((len(terms) for terms in doc_terms), dtype=np.int64, count=len(doc_terms))
+        self.doc_indptr = np.zeros(len(doc_terms) + 1, dtype=np.int64)
+        np.cumsum(doc_lengths, out=self.doc_indptr[1:])
+        entries = np.fromiter(chain.from_iterable(doc_terms), dtype=np.int32, count=int(self.doc_indptr[-1]))
+        entry_docs = np.repeat(np.arange(len(doc_terms), dtype=np.int32), doc_lengths)
+
+        # Rank of each term's first appearance, by video and then word order;
+        # ties in document frequency are listed in this order, the order a
+        # fresh index over the same videos would assign term IDs in
+        self.first_seen = np.full(len(self.terms), len(entries), dtype=np.int64)
+        unique_terms, first_entries = np.unique(entries, return_index=True)
+        self.first_seen[unique_terms] = first_entries
+
+        # Sort the term IDs of each video row
+        self.doc_indices = entries[np.lexsort((entries, entry_docs))]
+
+        # Transpose to term -> videos; the stable sort keeps video positions
+        # ascending within each term
+        order = np.argsort(self.doc_indices, kind='stable')
+        self.term_indices = entry_docs[order]
+        self.document_frequency = np.bincount(self.doc_indices, minlength=len(self.terms)).astype(np.int32)
+        self.term_indptr = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(self.document_frequency, out=self.term_indptr[1:])
+
+    # Independent index over the same videos; the arrays are shared since
+    # update() replaces them instead of writing into them
+    def copy(self):
+        index = TermIndex.__new__(TermIndex)
+        index.__dict__.update(self.__dict__)
+        index.term_ids = dict(self.term_ids)
+        index.terms = list(self.terms)
+        index._doc_terms = dict(self._doc_terms)
+        return index
+
+    # Term IDs of one video in word order; empty for unknown videos
+    def term_ids_of(self, video_id):
+        return self._doc_terms.get(video_id, [])
+
+    @property
+    def num_videos(self):
+        return len(self.video_ids)
+
+    # Video positions (ints) of the videos containing a term ID
+    def positions_of(self, term_id):
+        return self.term_indices[self.term_indptr[term_id]:self.term_indptr[term_id + 1]]
+
+    # Term IDs occurring in the video at a position
+    def terms_at(self, position):
+        return self.doc_indices[self.doc_indptr[position]:self.doc_indptr[position + 1]]
+
+    def count(self, term):
+        term_id = self.term_ids.get(term)
+        return 0 if term_id is None else int(self.document_frequency[term_id])
+
+    # IDs of the videos containing a term
+    def videos_containing(self, term):
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return []
+        return [self.video_ids[pos] for pos in self.positions_of(term_id)]
+
+    # Term IDs present in at least k videos, most frequent first
+    def term_ids_shared_by(self, k):
+        import numpy as np
+
+        term_ids = np.flatnonzero(self.document_frequency >= k)
+        return term_ids[np.lexsort((self.first_seen[term_ids], -self.document_frequency[term_ids]))]
+
+    # Terms present in at least k videos, most frequent first
+    def terms_shared_by(self, k):
+        return [self.terms[term_id] for term_id in self.term_ids_shared_by(k)]
+
+    # Terms two videos have in common
+    def shared_terms(self, video_a, video_b):
+        import numpy as np
+
+        common = np.intersect1d(
+            self.terms_at(self.video_positions[video_a]),
+            self.terms_at(self.video_positions[video_b]),
+            assume_unique=True
+        )
+        return [self.terms[term_id] for term_id in common]
+
+    # Terms of one video
+    def terms_of(self, video_id):
+        return [self.terms[term_id] for term_id in self.terms_at(self.video_positions[video_id])]
+
+    def __getitem__(self, term):
+        term_id = self.term_ids[term]
+        if not self.document_frequency[term_id]:
+            raise KeyError(term)
+        return (
+            int(self.document_frequency[term_id]),
+            [self.video_ids[pos] for pos in self.positions_of(term_id)]
+        )
+
+    # Terms of removed videos stay in the vocabulary but not in the mapping
+    def __contains__(self, term):
+        term_id = self.term_ids.get(term)
+        return term_id is not None and self.document_frequency[term_id] > 0
+
+    def __iter__(self):
+        import numpy as np
+
+        return (self.terms[term_id] for term_id in np.flatnonzero(self.document_frequency))
+
+    def __len__(self):
+        import numpy as np
+
+        return int(np.count_nonzero(self.document_frequency))
@@ -0,0 +1,109 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Every cache created in the process, by name, for the diagnostics panel
+CACHES = {}
+
+# Marks a cache miss, None is a valid cached value
+_MISSING = object()
+
+
+# Short content hash used as a cache key for arbitrary text
+def text_digest(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        data = part.encode('utf-8', 'surrogatepass')
+        # Length prefix, so ('ab', 'c') and ('a', 'bc') hash differently
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest.digest()
+
+
+# Thread-safe least-recently-used cache bounded by a total weight
+#
+# The weight of an entry defaults to 1, which bounds the number of entries;
+# caches of variable-size values pass a weight function (tokens in a list,
+# characters of HTML) so the bound is closer to memory. Values are shared
+# between callers and must not be mutated. All Streamlit sessions of the
+# process share one instance of each cache.
+class LRUCache:
+    def __init__(self, name, max_weight, weight=None):
+        self.name = name
+        self.max_weight = max_weight
+        self.weight = weight
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.total_weight = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        CACHES[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        weight = 1 if self.weight is None else self.weight(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_weight -= old[1]
+            # Values heavier than the whole cache are not kept
+            if weight > self.max_weight:
+                return value
+            self._entries[key] = (value, weight)
+            self.total_weight += weight
+
+            while self.total_weight > self.max_weight:
+                _, (_, evicted_weight) = self._entries.popitem(last=False)
+                self.total_weight -= evicted_weight
+                self.evictions += 1
+        return value
+
+    # Cached value of key, computing and storing it on a miss
+    #
+    # compute runs outside the lock; two sessions missing the same key at once
+    # both compute it and the last one is kept.
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_weight = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'weight': self.total_weight,
+            'max_weight': self.max_weight,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+# Stats of every cache, by name
+def memo_stats():
+    return {name: cache.stats() for name, cache in CACHES.items()}
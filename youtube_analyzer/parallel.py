@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from youtube_analyzer.diagnostics import stage
+from youtube_analyzer.memo import text_digest
+from youtube_analyzer.tokenizer import DEFAULT_TOKENIZER, TOKEN_CACHE
+
+# Tokenizer processes used when a caller does not choose; 1 tokenizes in the
+# calling process, 0 uses every core
+DEFAULT_WORKERS = int(os.environ.get('YOUTUBE_ANALYZER_WORKERS', '1'))
+
+# Below this many characters to tokenize, sending texts to other processes
+# and their tokens back costs more than it saves
+PARALLEL_MIN_CHARS = 500_000
+
+# Work units per worker, so a slow chunk does not leave the others idle
+CHUNKS_PER_WORKER = 4
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Set once a pool breaks, after which the process tokenizes serially
+_pools_broken = False
+
+
+def resolve_workers(workers=None):
+    workers = DEFAULT_WORKERS if workers is None else workers
+    if workers == 0:
+        return os.cpu_count() or 1
+    return max(1, workers)
+
+
+# Long-lived pool of tokenizer processes, one per worker count
+#
+# Workers are spawned rather than forked: the app and the CLI run API
+# threads, and a fork taken while another thread holds a lock can deadlock
+# the child. Each worker compiles DEFAULT_TOKENIZER once, when it imports
+# the tokenizer module, and reuses it for every chunk it is sent.
+def get_process_pool(workers):
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return pool
+
+
+# Stop every pool; the next parallel call starts afresh
+def shutdown_process_pools():
+    global _pools_broken
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+        _pools_broken = False
+
+
+# Runs in a worker process
+def _tokenize_chunk(texts):
+    return [tuple(DEFAULT_TOKENIZER.tokenize(text)) for text in texts]
+
+
+def _chunks(items, count):
+    size = -(-len(items) // count)
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+# Tokens of the texts that are not cached, in order, from the process pool;
+# None if the pool broke and the caller has to tokenize them itself
+def _tokenize_in_pool(texts, workers):
+    chunks = _chunks(texts, workers * CHUNKS_PER_WORKER)
+    try:
+        with stage('tokenize_parallel'):
+            results = get_process_pool(workers).map(_tokenize_chunk, chunks)
+            return [tokens for chunk in results for tokens in chunk]
+    except (BrokenProcessPool, OSError):
+        # Workers that can not start (e.g. the main module can not be
+        # re-imported) or were killed; rather than paying for a new pool
+        # that may break again, the rest of the process runs serially
+        global _pools_broken
+        with _pools_lock:
+            _pools_broken = True
+            pool = _pools.pop(workers, None)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return None
+
+
+# Tokens of many texts, like tokenize_text on each of them
+#
+# Cached texts are served from the token cache. The rest are tokenized in a
+# pool of `workers` processes when there is enough text to repay the
+# transfer, and serially otherwise; either way their tokens are cached.
+def tokenize_many(texts, workers=None):
+    workers = resolve_workers(workers)
+    keys = [text_digest(text) for text in texts]
+    tokens = [TOKEN_CACHE.get(key) for key in keys]
+
+    # Each distinct uncached text is tokenized once
+    pending = {}
+    for position, key in enumerate(keys):
+        if tokens[position] is None:
+            pending.setdefault(key, texts[position])
+
+    if pending:
+        pending_texts = list(pending.values())
+        tokenized = None
+        if workers > 1 and not _pools_broken and sum(map(len, pending_texts)) >= PARALLEL_MIN_CHARS:
+            tokenized = _tokenize_in_pool(pending_texts, workers)
+        if tokenized is None:
+            with stage('tokenize_text'):
+                tokenized = _tokenize_chunk(pending_texts)
+
+        fresh = {key: TOKEN_CACHE.put(key, result) for key, result in zip(pending, tokenized)}
+        tokens = [fresh[key] if result is None else result for key, result in zip(keys, tokens)]
+
+    # Callers get their own lists, the cached tuples are shared
+    return [list(result) for result in tokens]
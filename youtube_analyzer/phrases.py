@@ -0,0 +1,164 @@
+import heapq
+from collections import Counter
+
+from youtube_analyzer.diagnostics import timed
+from youtube_analyzer.frequency import video_urls
+from youtube_analyzer.tokenizer import DEFAULT_TOKENIZER
+
+# Phrase lengths mined, in words
+DEFAULT_NGRAM_SIZES = (2, 3)
+
+# Candidate phrases held at once; past this the rarest are pruned
+DEFAULT_MAX_CANDIDATES = 100_000
+
+# Share of max_candidates kept by a prune, so prunes stay infrequent
+PRUNE_TARGET = 0.5
+
+# Phrases shown per table
+DEFAULT_TOP_K = 50
+
+# Candidates re-counted exactly for every phrase reported
+CANDIDATE_FACTOR = 2
+
+
+# Distinct phrases of one video's texts
+#
+# A phrase is n consecutive words of one segment (see Tokenizer.segments)
+# that neither starts nor ends with a stop word or a word shorter than the
+# tokenizer's minimum, so "rain sounds for sleeping" is a phrase but "sounds
+# for" is not. Repeats such as "lofi lofi" are skipped.
+def video_phrases(texts, sizes=DEFAULT_NGRAM_SIZES, tokenizer=DEFAULT_TOKENIZER):
+    stop_words = tokenizer.stop_words
+    min_length = tokenizer.min_length
+    phrases = set()
+    for text in texts:
+        for words in tokenizer.segments(text):
+            edge = [word not in stop_words and len(word) >= min_length for word in words]
+            for size in sizes:
+                for start in range(len(words) - size + 1):
+                    end = start + size - 1
+                    if edge[start] and edge[end] and words[start] != words[end]:
+                        phrases.add(' '.join(words[start:end + 1]))
+    return phrases
+
+
+# Streaming count of the videos containing each phrase, in bounded memory
+#
+# Each video adds its distinct phrases once, as count_words_across_videos
+# counts words. Entries are keyed by the phrase's 64-bit hash, so a
+# candidate costs the same however long the phrase; the text is kept only
+# once a second video shares the phrase, as most candidates are seen once
+# and a phrase of one video is never reported. Colliding hashes would share
+# a count, which is negligible at 64 bits for max_candidates entries.
+#
+# When more than max_candidates are held, the rarest are dropped (lossy
+# counting): every entry remembers the prune floor it was created under, so
+# its count is a lower bound on the true count and count + error an upper
+# bound. Phrases shared by many videos are never pruned before they are
+# reported, and memory stays bounded however many videos are added.
+class PhraseCounter:
+    def __init__(self, sizes=DEFAULT_NGRAM_SIZES, max_candidates=DEFAULT_MAX_CANDIDATES, tokenizer=DEFAULT_TOKENIZER):
+        self.sizes = sizes
+        self.max_candidates = max_candidates
+        self.tokenizer = tokenizer
+        self.total_videos = 0
+        self.floor = 0
+        self.prunes = 0
+        # hash(phrase) -> [count, error]
+        self._entries = {}
+        # hash(phrase) -> phrase, for entries counted in two videos or more
+        self._phrases = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Count the phrases of one video, given its texts
+    def add(self, texts):
+        self.total_videos += 1
+        entries = self._entries
+        for phrase in video_phrases(texts, self.sizes, self.tokenizer):
+            key = hash(phrase)
+            entry = entries.get(key)
+            if entry is None:
+                entries[key] = [1, self.floor]
+            else:
+                entry[0] += 1
+                if entry[0] == 2:
+                    self._phrases[key] = phrase
+        if len(entries) > self.max_candidates:
+            self.prune()
+
+    # Raise the floor until at most PRUNE_TARGET of max_candidates remain
+    def prune(self):
+        target = int(self.max_candidates * PRUNE_TARGET)
+        bounds = Counter(count + error for count, error in self._entries.values())
+        remaining = len(self._entries)
+        floor = self.floor + 1
+        for bound in sorted(bounds):
+            if remaining <= target:
+                break
+            remaining -= bounds[bound]
+            floor = max(floor, bound)
+        self.floor = floor
+        self._entries = {key: entry for key, entry in self._entries.items() if entry[0] + entry[1] > floor}
+        self._phrases = {key: phrase for key, phrase in self._phrases.items() if key in self._entries}
+        self.prunes += 1
+
+    # (phrase, count) of the k phrases found in most videos, at least
+    # min_count and never fewer than two; ties keep the order phrases were
+    # first seen in
+    def top(self, k=DEFAULT_TOP_K, min_count=2):
+        entries = (
+            (key, count) for key, (count, _) in self._entries.items()
+            if count >= min_count and key in self._phrases
+        )
+        return [(self._phrases[key], count) for key, count in heapq.nlargest(k, entries, key=lambda entry: entry[1])]
+
+
+# (phrase, positions) of the top_k phrases shared by at least min_count of
+# the videos; texts_per_video is a list of the texts of each video, in video
+# order
+#
+# One streaming pass finds the candidates in bounded memory; a second pass
+# counts the best of them exactly and finds their videos, so the reported
+# counts do not depend on pruning. Most frequent first, ties in the order
+# the phrases first appear.
+@timed('mine_phrases')
+def mine_phrases(texts_per_video, top_k=DEFAULT_TOP_K, min_count=2, sizes=DEFAULT_NGRAM_SIZES,
+                 max_candidates=DEFAULT_MAX_CANDIDATES):
+    counter = PhraseCounter(sizes, max_candidates)
+    for texts in texts_per_video:
+        counter.add(texts)
+
+    candidates = {phrase: [] for phrase, _ in counter.top(top_k * CANDIDATE_FACTOR, min_count)}
+    if not candidates:
+        return []
+    for position, texts in enumerate(texts_per_video):
+        for phrase in video_phrases(texts, sizes) & candidates.keys():
+            candidates[phrase].append(position)
+
+    first_seen = {phrase: positions[0] if positions else 0 for phrase, positions in candidates.items()}
+    ranked = sorted(
+        (item for item in candidates.items() if len(item[1]) >= min_count),
+        key=lambda item: (-len(item[1]), first_seen[item[0]])
+    )
+    return ranked[:top_k]
+
+
+# Phrase table in the shape of create_word_frequency_df, the first column
+# named Phrase; index is the TermIndex of the analysis, for video URLs
+def create_phrase_frequency_df(phrases, index, total_videos):
+    import pandas as pd
+
+    if not phrases:
+        return pd.DataFrame()
+
+    urls = video_urls(index)
+    df = pd.DataFrame({
+        'Phrase': [phrase for phrase, _ in phrases],
+        'Frequency': [f"{len(positions)} out of {total_videos}" for _, positions in phrases],
+        'Videos': [", ".join(urls[positions]) for _, positions in phrases]
+    })
+    # Index starts from 1 instead of 0
+    df.index = pd.RangeIndex(1, len(df) + 1)
+    return df
@@ -0,0 +1,200 @@
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from youtube_analyzer.cache import DEFAULT_CACHE_PATH, connect
+from youtube_analyzer.diagnostics import count
+
+# Quota units charged per call of each API method
+QUOTA_COSTS = {
+    'videos.list': 1,
+    'channels.list': 1,
+    'playlistItems.list': 1,
+    'search.list': 100
+}
+
+# Default budgets; the API key's daily allowance is 10,000 units
+DEFAULT_RUN_BUDGET = 2000
+DEFAULT_DAILY_BUDGET = 10000
+
+# Errors worth retrying: rate limits and transient server failures
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+QUOTA_EXHAUSTED_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 32.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota_usage (
+    day TEXT PRIMARY KEY,
+    units INTEGER NOT NULL
+);
+"""
+
+
+# Raised when a call would exceed the per-run or per-day quota budget
+class QuotaExceeded(Exception):
+    pass
+
+
+# The API quota resets at midnight Pacific Time
+def quota_day(now=None):
+    try:
+        from zoneinfo import ZoneInfo
+        pacific = ZoneInfo('America/Los_Angeles')
+    except Exception:
+        pacific = timezone(timedelta(hours=-8))
+    now = datetime.now(pacific) if now is None else now.astimezone(pacific)
+    return now.date().isoformat()
+
+
+# Extract the machine-readable reason from an HttpError
+def error_reason(error):
+    details = getattr(error, 'error_details', None)
+    if isinstance(details, list):
+        for detail in details:
+            if isinstance(detail, dict) and detail.get('reason'):
+                return detail['reason']
+    try:
+        content = error.content.decode('utf-8') if isinstance(error.content, bytes) else error.content
+        return json.loads(content)['error']['errors'][0]['reason']
+    except (AttributeError, KeyError, IndexError, TypeError, ValueError):
+        return ''
+
+
+# Quota units used per day, persisted so every run and session shares the count
+class QuotaLedger:
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def used_today(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT units FROM quota_usage WHERE day = ?", (quota_day(),)
+            ).fetchone()
+        return row[0] if row else 0
+
+    # Add units to today's usage unless that would exceed budget; returns
+    # whether they were added
+    #
+    # The check and the add are one statement, so schedulers of other
+    # sessions and processes sharing the database can not both pass the
+    # check and overshoot the budget together.
+    def try_add(self, units, budget):
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO quota_usage (day, units) SELECT ?, ? WHERE ? <= ? "
+                "ON CONFLICT(day) DO UPDATE SET units = units + excluded.units "
+                "WHERE units + excluded.units <= ?",
+                (quota_day(), units, units, budget, budget)
+            )
+            return cursor.rowcount > 0
+
+
+@lru_cache(maxsize=None)
+def get_quota_ledger(path=DEFAULT_CACHE_PATH):
+    return QuotaLedger(path)
+
+
+# Runs API calls within a quota budget, retrying rate limits and 5xx errors
+#
+# One scheduler covers one analysis run. Every attempt is charged against the
+# run budget and the shared daily ledger before it is sent, since the API
+# bills failed calls as well.
+class QuotaScheduler:
+    def __init__(self, run_budget=DEFAULT_RUN_BUDGET, daily_budget=DEFAULT_DAILY_BUDGET,
+                 ledger=None, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE,
+                 backoff_cap=BACKOFF_CAP, sleep=time.sleep):
+        self.run_budget = run_budget
+        self.daily_budget = daily_budget
+        self.ledger = get_quota_ledger() if ledger is None else ledger
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.sleep = sleep
+
+        self._lock = threading.Lock()
+        self.units_used = 0
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.backoff_seconds = 0.0
+        self.exhausted = False
+
+    # Charge one call against both budgets or raise QuotaExceeded
+    def reserve(self, method):
+        cost = QUOTA_COSTS.get(method, 1)
+        with self._lock:
+            if self.exhausted:
+                raise QuotaExceeded("The API key's daily quota is exhausted")
+            if self.units_used + cost > self.run_budget:
+                raise QuotaExceeded(f"Run quota budget of {self.run_budget} units reached")
+            if not self.ledger.try_add(cost, self.daily_budget):
+                raise QuotaExceeded(f"Daily quota budget of {self.daily_budget} units reached")
+            self.units_used += cost
+            self.calls += 1
+        count('api_calls')
+        count('api_units', cost)
+
+    # Full-jitter exponential backoff delay for the given retry attempt; a
+    # Retry-After from the server is honoured up to the same cap
+    def backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    # Execute a request through `execute`, retrying transient failures
+    def execute(self, execute, request, method='videos.list'):
+        from googleapiclient.errors import HttpError
+
+        attempt = 0
+        while True:
+            self.reserve(method)
+            try:
+                return execute(request)
+            except HttpError as e:
+                status = e.resp.status
+                reason = error_reason(e)
+
+                if reason in QUOTA_EXHAUSTED_REASONS:
+                    with self._lock:
+                        self.exhausted = True
+                    raise
+
+                rate_limited = status == 429 or reason in RATE_LIMIT_REASONS
+                if not (rate_limited or status in RETRYABLE_STATUSES) or attempt >= self.max_retries:
+                    raise
+
+                retry_after = e.resp.get('retry-after')
+                delay = self.backoff(attempt, float(retry_after) if retry_after and retry_after.isdigit() else None)
+            except OSError:
+                # Connection resets and socket timeouts
+                if attempt >= self.max_retries:
+                    raise
+                rate_limited = False
+                delay = self.backoff(attempt)
+
+            with self._lock:
+                self.retries += 1
+                self.throttled += rate_limited
+                self.backoff_seconds += delay
+            self.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'units_used': self.units_used,
+            'run_remaining': max(0, self.run_budget - self.units_used),
+            'daily_remaining': max(0, self.daily_budget - self.ledger.used_today()),
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'backoff_seconds': self.backoff_seconds
+        }
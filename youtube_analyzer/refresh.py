@@ -0,0 +1,171 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from functools import lru_cache
+
+from youtube_analyzer.cache import DEFAULT_CACHE_PATH, get_video_cache
+from youtube_analyzer.client import get_youtube_client
+from youtube_analyzer.diagnostics import count, timed
+from youtube_analyzer.history import get_view_history
+from youtube_analyzer.quota import DEFAULT_DAILY_BUDGET, QuotaExceeded, QuotaScheduler, get_quota_ledger
+from youtube_analyzer.videos import MAX_IDS_PER_REQUEST, chunk_ids, merge_statistics
+
+# Quota units one refresh cycle may spend; each unit polls 50 videos
+DEFAULT_CYCLE_BUDGET = 20
+
+# Seconds between refresh cycles of the background job
+DEFAULT_PERIOD = 15 * 60
+
+
+# Polls the view counts of tracked videos that are due, within a quota budget
+#
+# Each cycle asks the history for at most cycle_budget * 50 due videos,
+# most overdue first, and polls them with statistics-only videos.list calls
+# of 50 IDs, charged against the cycle budget and the shared daily ledger.
+# Polled view counts also refresh the video cache. With tens of thousands
+# of tracked videos the spend stays at cycle_budget units per period; the
+# videos that change fastest are polled more often, see next_interval.
+class StatsRefresher:
+    def __init__(self, api_key, path=DEFAULT_CACHE_PATH, cycle_budget=DEFAULT_CYCLE_BUDGET,
+                 daily_budget=DEFAULT_DAILY_BUDGET, period=DEFAULT_PERIOD, client=None):
+        self.api_key = api_key
+        self.path = path
+        self.cycle_budget = cycle_budget
+        self.daily_budget = daily_budget
+        self.period = period
+        self.client = client
+        self.history = get_view_history(path)
+        self.cache = get_video_cache(path)
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Poll the videos due now; returns what the cycle did
+    @timed('refresh_stats')
+    def run_once(self, now=None):
+        from googleapiclient.errors import HttpError
+
+        now = time.time() if now is None else now
+        video_ids = self.history.due(self.cycle_budget * MAX_IDS_PER_REQUEST, now)
+        result = {'at': now, 'due': len(video_ids), 'refreshed': 0, 'missing': 0, 'failed': 0,
+                  'units': 0, 'errors': []}
+        if not video_ids:
+            self.last_result = result
+            return result
+
+        client = get_youtube_client(self.api_key) if self.client is None else self.client
+        scheduler = QuotaScheduler(run_budget=self.cycle_budget, daily_budget=self.daily_budget,
+                                   ledger=get_quota_ledger(self.path))
+        chunks = chunk_ids(video_ids)
+        requests = [client.service.videos().list(part='statistics', id=','.join(chunk)) for chunk in chunks]
+        futures = client.submit_all(requests, scheduler)
+
+        observations = {}
+        missing = []
+        for chunk, future in zip(chunks, futures):
+            try:
+                response = future.result()
+            except (HttpError, QuotaExceeded) as e:
+                result['failed'] += len(chunk)
+                result['errors'].append(str(e))
+                continue
+            items = {item['id']: item for item in response.get('items', [])}
+            for video_id in chunk:
+                item = items.get(video_id)
+                if item is None:
+                    missing.append(video_id)
+                else:
+                    observations[video_id] = int(item.get('statistics', {}).get('viewCount', 0))
+
+        self.history.record(observations, now)
+        self.history.postpone(missing, now)
+
+        # Cached videos get the new view counts as well
+        cached = self.cache.get_many(list(observations))
+        self.cache.store(
+            [merge_statistics(video, {'statistics': {'viewCount': observations[video_id]}})
+             for video_id, video in cached.items()],
+            static=False
+        )
+
+        count('stats_refreshed', len(observations))
+        result.update(refreshed=len(observations), missing=len(missing), units=scheduler.units_used,
+                      errors=list(dict.fromkeys(result['errors'])))
+        self.last_result = result
+        return result
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # Run a cycle every period on a daemon thread until stop()
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='stats-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                # A failed cycle is reported and retried next period
+                self.last_result = {'at': time.time(), 'errors': [f"Refresh failed: {e}"]}
+            self._stop.wait(self.period)
+
+
+# One refresher per API key and database file, shared by every session
+@lru_cache(maxsize=8)
+def get_stats_refresher(api_key, path=DEFAULT_CACHE_PATH):
+    return StatsRefresher(api_key, path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m youtube_analyzer.refresh',
+        description="Poll the view counts of the tracked videos that are due, e.g. from cron."
+    )
+    parser.add_argument('--api-key', default=os.environ.get('YOUTUBE_API_KEY'),
+                        help="YouTube Data API key, defaults to $YOUTUBE_API_KEY")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="SQLite file of the cache and view history")
+    parser.add_argument('--cycle-budget', type=int, default=DEFAULT_CYCLE_BUDGET,
+                        help="quota units per cycle, 50 videos each (default: %(default)s)")
+    parser.add_argument('--daily-budget', type=int, default=DEFAULT_DAILY_BUDGET, help="quota units per Pacific day")
+    parser.add_argument('--loop', type=float, metavar='SECONDS',
+                        help="keep running, one cycle every SECONDS, instead of a single cycle")
+    args = parser.parse_args(argv)
+    if not args.api_key:
+        parser.error("an API key is required, pass --api-key or set YOUTUBE_API_KEY")
+    if args.cycle_budget < 1:
+        parser.error("--cycle-budget must be positive")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    refresher = StatsRefresher(args.api_key, args.cache, args.cycle_budget, args.daily_budget)
+    while True:
+        result = refresher.run_once()
+        stats = refresher.history.stats()
+        print(
+            f"{result['refreshed']} refreshed, {result['missing']} missing, {result['failed']} failed"
+            f" of {result['due']} due | {result['units']} quota units"
+            f" | {stats['tracked']} tracked, {stats['due']} still due",
+            file=sys.stderr, flush=True
+        )
+        for error in result['errors']:
+            print(f"error: {error}", file=sys.stderr)
+        if args.loop is None:
+            return 1 if result['failed'] else 0
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
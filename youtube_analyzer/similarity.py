@@ -0,0 +1,226 @@
+from youtube_analyzer.diagnostics import timed
+from youtube_analyzer.memo import LRUCache
+
+# Weight of each analyzed field in the similarity of two videos
+DEFAULT_FIELD_WEIGHTS = {
+    'title_analysis': 1.0,
+    'tag_analysis': 1.0,
+    'desc_analysis': 1.0
+}
+
+# Neighbours kept per video
+DEFAULT_NEIGHBOURS = 10
+
+# Terms in more videos than this are multiplied as dense columns; rarer ones
+# are expanded into the pairs of videos sharing them
+DENSE_MIN_VIDEOS = 16
+
+# Rows of the similarity matrix held at once
+BLOCK_SIZE = 512
+
+# Neighbours at least this similar are grouped into the same cluster
+DEFAULT_CLUSTER_THRESHOLD = 0.3
+
+# Similarity results of recent analyses, bounded by their number of videos
+SIMILARITY_CACHE_SIZE = 50_000
+SIMILARITY_CACHE = LRUCache('similarity', SIMILARITY_CACHE_SIZE, weight=lambda result: len(result.neighbours) + 1)
+
+
+# Top-k most similar videos of every video of an analysis
+#
+# neighbours[p] are the positions of the videos most similar to the video at
+# position p, most similar first, and scores[p] their similarities in
+# [0, 1]; rows are padded with -1 and 0 when fewer videos share a term.
+class SimilarityResult:
+    def __init__(self, neighbours, scores):
+        self.neighbours = neighbours
+        self.scores = scores
+
+    # Cluster label of every video, see cluster_videos
+    def clusters(self, threshold=DEFAULT_CLUSTER_THRESHOLD):
+        return cluster_videos(self.neighbours, self.scores, threshold)
+
+
+# TF-IDF weights of one field: (idf of each term, squared norm of each video)
+#
+# The term indexes record whether a video contains a term, not how often,
+# so a video's vector holds the smoothed idf of each of its terms.
+def _idf_weights(index):
+    import numpy as np
+
+    total = index.num_videos
+    idf = (np.log((1 + total) / (1 + index.document_frequency)) + 1).astype(np.float64)
+    squared = np.bincount(
+        np.repeat(np.arange(total), np.diff(index.doc_indptr)),
+        weights=idf[index.doc_indices] ** 2,
+        minlength=total
+    )
+    return idf, squared
+
+
+# Dense (videos x frequent terms) matrix of one field, scaled so the product
+# with its transpose is the frequent terms' share of the weighted cosine
+def _dense_part(index, idf, scale, term_ids):
+    import numpy as np
+
+    matrix = np.zeros((index.num_videos, len(term_ids)), dtype=np.float32)
+    for column, term_id in enumerate(term_ids):
+        matrix[index.positions_of(term_id), column] = idf[term_id]
+    return matrix * scale[:, None].astype(np.float32)
+
+
+# (video, other video, weight) of every ordered pair of distinct videos
+# sharing one of the rare terms, sorted by video
+def _sparse_pairs(index, idf, scale, term_ids):
+    import numpy as np
+
+    lengths = index.document_frequency[term_ids].astype(np.int64)
+    starts = index.term_indptr[term_ids]
+    # Postings of the rare terms, one after another
+    entry_terms = np.repeat(np.arange(len(term_ids)), lengths)
+    entry_offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    postings = index.term_indices[np.repeat(starts, lengths) + entry_offsets]
+    local_starts = np.cumsum(lengths) - lengths
+
+    # Each posting pairs with every posting of its term
+    counts = lengths[entry_terms]
+    videos = np.repeat(postings, counts)
+    pair_offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    others = postings[np.repeat(local_starts[entry_terms], counts) + pair_offsets]
+    weights = np.repeat(idf[term_ids][entry_terms] ** 2, counts) * scale[videos] * scale[others]
+
+    distinct = videos != others
+    videos, others, weights = videos[distinct], others[distinct], weights[distinct]
+    order = np.argsort(videos, kind='stable')
+    return videos[order], others[order], weights[order]
+
+
+# Weighted cosine similarity of the TF-IDF vectors of titles, tags and
+# descriptions, as top-k neighbours per video
+#
+# field_indexes maps analyzed fields to their TermIndex, all over the same
+# videos in the same order. The similarity of two videos is the weighted
+# mean of the cosine similarities of their fields, so a long description
+# does not outweigh the title.
+#
+# The matrix product is split by document frequency: terms in many videos
+# form dense columns multiplied with BLAS, rare terms are expanded into the
+# pairs of videos sharing them, which are few. Rows are computed
+# BLOCK_SIZE at a time, so memory grows with videos * BLOCK_SIZE rather
+# than the square of the number of videos; terms found in a single video
+# only count toward the norms.
+@timed('video_similarity')
+def video_similarity(field_indexes, k=DEFAULT_NEIGHBOURS, field_weights=None):
+    import numpy as np
+
+    field_weights = DEFAULT_FIELD_WEIGHTS if field_weights is None else field_weights
+    total = next(iter(field_indexes.values())).num_videos
+    k = max(0, min(k, total - 1))
+    total_weight = sum(field_weights.get(field, 0) for field in field_indexes) or 1
+
+    dense_parts = []
+    pairs = []
+    for field, index in field_indexes.items():
+        weight = field_weights.get(field, 0)
+        if not weight or index.num_videos != total:
+            continue
+        idf, squared = _idf_weights(index)
+        norms = np.sqrt(squared)
+        # Per-video factor of the field: its share of the mean over its norm
+        scale = np.zeros(total)
+        np.divide(np.sqrt(weight / total_weight), norms, out=scale, where=norms > 0)
+
+        frequency = index.document_frequency
+        dense_terms = np.flatnonzero(frequency > DENSE_MIN_VIDEOS)
+        sparse_terms = np.flatnonzero((frequency >= 2) & (frequency <= DENSE_MIN_VIDEOS))
+        if len(dense_terms):
+            dense_parts.append(_dense_part(index, idf, scale, dense_terms))
+        if len(sparse_terms):
+            pairs.append(_sparse_pairs(index, idf, scale, sparse_terms))
+
+    dense = np.hstack(dense_parts) if dense_parts else np.zeros((total, 0), dtype=np.float32)
+    if pairs:
+        videos, others, weights = (np.concatenate(parts) for parts in zip(*pairs))
+        order = np.argsort(videos, kind='stable')
+        videos, others, weights = videos[order], others[order], weights[order]
+    else:
+        videos = others = np.zeros(0, dtype=np.int64)
+        weights = np.zeros(0)
+
+    neighbours = np.full((total, k), -1, dtype=np.int32)
+    scores = np.zeros((total, k), dtype=np.float32)
+    if k == 0:
+        return SimilarityResult(neighbours, scores)
+
+    for start in range(0, total, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, total)
+        block = (dense[start:stop] @ dense.T).astype(np.float64)
+        low, high = np.searchsorted(videos, [start, stop])
+        if high > low:
+            block += np.bincount(
+                (videos[low:high] - start) * total + others[low:high],
+                weights=weights[low:high],
+                minlength=(stop - start) * total
+            ).reshape(stop - start, total)
+        # A video is not its own neighbour
+        block[np.arange(stop - start), np.arange(start, stop)] = -1
+
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        # Most similar first, ties by position
+        order = np.lexsort((top, -top_scores), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        found = top_scores > 1e-9
+        neighbours[start:stop] = np.where(found, top, -1)
+        scores[start:stop] = np.where(found, np.minimum(top_scores, 1), 0)
+
+    return SimilarityResult(neighbours, scores)
+
+
+# Cluster label of every video: connected components of the neighbour
+# graph over edges at least `threshold` similar
+#
+# Clusters are numbered from 0 by decreasing size, ties by their first
+# video; videos without such a neighbour get -1.
+def cluster_videos(neighbours, scores, threshold=DEFAULT_CLUSTER_THRESHOLD):
+    import numpy as np
+
+    total = len(neighbours)
+    rows, columns = np.nonzero((scores >= threshold) & (neighbours >= 0))
+    sources = rows.astype(np.int64)
+    targets = neighbours[rows, columns].astype(np.int64)
+
+    # Each video takes the smallest label among its neighbours until no
+    # label changes; pointer jumping shortens long chains
+    labels = np.arange(total)
+    while True:
+        smallest = np.minimum(labels[sources], labels[targets])
+        updated = labels.copy()
+        np.minimum.at(updated, sources, smallest)
+        np.minimum.at(updated, targets, smallest)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+
+    roots, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    # roots are ascending, so the stable sort keeps ties in video order
+    ranking = np.argsort(-sizes, kind='stable')
+    cluster_of_root = np.empty(len(roots), dtype=np.int32)
+    cluster_of_root[ranking] = np.arange(len(roots), dtype=np.int32)
+    clusters = cluster_of_root[inverse]
+    clusters[sizes[inverse] < 2] = -1
+    # Singletons sort last, so clusters with members are numbered 0, 1, ...
+    return clusters
+
+
+# Similarity of an analysis, computed once and shared like its tables
+def get_similarity(analysis_key, analysis_results, k=DEFAULT_NEIGHBOURS):
+    return SIMILARITY_CACHE.get_or_compute(
+        (analysis_key, k),
+        lambda: video_similarity(
+            {field: analysis_results[field]['word_count'] for field in DEFAULT_FIELD_WEIGHTS}, k
+        )
+    )
@@ -0,0 +1,260 @@
+import base64
+import hashlib
+import heapq
+import json
+import math
+
+# Share of all (term, video) occurrences a reported count may overstate by
+DEFAULT_COUNT_ERROR = 0.001
+
+# Relative standard error of the distinct video estimate of a term
+DEFAULT_DISTINCT_ERROR = 0.05
+
+# Bounds of the HyperLogLog precision, in bits of the register index
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+SKETCH_FORMAT_VERSION = 1
+
+
+# Stable 64-bit hash of a video ID
+#
+# Python's hash() is salted per process, sketches of separate runs would not
+# agree on it and could not be merged.
+def video_hash(video_id):
+    return int.from_bytes(hashlib.blake2b(video_id.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+# HyperLogLog precision giving at most the relative standard error
+def precision_for(relative_error):
+    precision = math.ceil(2 * math.log2(1.04 / relative_error))
+    return min(MAX_PRECISION, max(MIN_PRECISION, precision))
+
+
+# (register index, rank) of a video hash: the first precision bits pick the
+# register, the rank is one more than the leading zeros of the rest
+def register_update(hashed, precision):
+    rest_bits = 64 - precision
+    rest = hashed & ((1 << rest_bits) - 1)
+    return hashed >> rest_bits, rest_bits - rest.bit_length() + 1
+
+
+# Distinct count estimated from HyperLogLog registers, with the linear
+# counting correction for small counts
+def hll_estimate(registers):
+    import numpy as np
+
+    values = np.frombuffer(bytes(registers), dtype=np.uint8)
+    size = len(values)
+    alpha = 0.7213 / (1 + 1.079 / size)
+    estimate = alpha * size * size / np.ldexp(1.0, -values.astype(np.int64)).sum()
+    if estimate <= 2.5 * size:
+        zeros = int(np.count_nonzero(values == 0))
+        if zeros:
+            estimate = size * math.log(size / zeros)
+    return estimate
+
+
+# Registers of the union of two sets of videos
+def merge_registers(first, second):
+    import numpy as np
+
+    return bytearray(np.maximum(np.frombuffer(first, dtype=np.uint8), np.frombuffer(second, dtype=np.uint8)).tobytes())
+
+
+# Approximate document frequencies of the most frequent terms, in fixed memory
+#
+# A Space-Saving summary of `capacity` terms: a term that is not tracked
+# replaces the least counted one and inherits its count, so a reported count
+# overstates the true count by at most occurrences / capacity and every term
+# above that share is tracked. Each tracked term also holds HyperLogLog
+# registers of its videos, inherited on replacement like the count, which
+# estimate its distinct videos; a video seen twice, or in two merged shards,
+# is counted once there.
+#
+# Memory is capacity * (2 ** precision) bytes of registers plus the terms,
+# whatever the number of videos. Sketches built with the same parameters
+# merge into the sketch of the union of their videos (Agarwal et al.,
+# "Mergeable summaries"), so shards can be counted separately.
+#
+# Only the command line counts approximately, into its *_terms tables; the
+# app analyzes the videos it holds in memory and keeps exact counts with
+# their Videos column, which a sketch can not give.
+class TermSketch:
+    def __init__(self, capacity=None, precision=None, count_error=DEFAULT_COUNT_ERROR,
+                 distinct_error=DEFAULT_DISTINCT_ERROR):
+        self.capacity = capacity or math.ceil(1 / count_error)
+        self.precision = precision or precision_for(distinct_error)
+        self.total_videos = 0
+        self.occurrences = 0
+        # Registers of every video, for the distinct count of merged shards
+        self._videos = bytearray(1 << self.precision)
+        # term -> [count, error, registers, first seen]
+        self._entries = {}
+        # (count, first seen, term), possibly stale; see _pop_min
+        self._heap = []
+        self._seen = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Estimate from a count and the registers of the same videos: the count,
+    # unless the registers see clearly fewer distinct videos (beyond three
+    # standard errors), as when shards with the same videos were merged
+    def _estimate(self, count, registers):
+        distinct = hll_estimate(registers)
+        if distinct >= count * (1 - 3 * 1.04 / math.sqrt(len(registers))):
+            return count
+        return round(distinct)
+
+    # Distinct videos counted, see _estimate
+    def video_count(self):
+        return self._estimate(self.total_videos, self._videos)
+
+    # Largest amount a reported count may exceed the true count by
+    def error_bound(self):
+        return self.occurrences // self.capacity if len(self._entries) >= self.capacity else 0
+
+    # Count the distinct words of one video
+    def add(self, video_id, words):
+        self.total_videos += 1
+        index, rank = register_update(video_hash(video_id), self.precision)
+        if rank > self._videos[index]:
+            self._videos[index] = rank
+        entries = self._entries
+        for word in dict.fromkeys(words):
+            self.occurrences += 1
+            entry = entries.get(word)
+            if entry is None:
+                entry = self._admit(word)
+            else:
+                entry[0] += 1
+            registers = entry[2]
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def _admit(self, word):
+        self._seen += 1
+        if len(self._entries) < self.capacity:
+            entry = self._entries[word] = [1, 0, bytearray(1 << self.precision), self._seen]
+        else:
+            count, _, evicted = self._pop_min()
+            registers = self._entries.pop(evicted)[2]
+            entry = self._entries[word] = [count + 1, count, registers, self._seen]
+        heapq.heappush(self._heap, (entry[0], entry[3], word))
+        return entry
+
+    # Remove and return the heap item of the least counted term
+    #
+    # Counts only grow, so the heap is not touched on every increment: an
+    # item whose count is behind its entry is pushed back with the current
+    # count until the smallest item is up to date.
+    def _pop_min(self):
+        while True:
+            count, seen, word = heapq.heappop(self._heap)
+            current = self._entries[word][0]
+            if current == count:
+                return count, seen, word
+            heapq.heappush(self._heap, (current, seen, word))
+
+    # Sketch of the videos of both sketches; neither is changed
+    def merge(self, other):
+        if (self.capacity, self.precision) != (other.capacity, other.precision):
+            raise ValueError(
+                f"sketches of capacity {self.capacity}, precision {self.precision} and "
+                f"capacity {other.capacity}, precision {other.precision} can not be merged"
+            )
+        merged = TermSketch(self.capacity, self.precision)
+        merged.total_videos = self.total_videos + other.total_videos
+        merged.occurrences = self.occurrences + other.occurrences
+        merged._videos = merge_registers(self._videos, other._videos)
+
+        # A term a full summary does not track may have been counted up to
+        # its smallest count
+        floors = [sketch._floor() for sketch in (self, other)]
+        combined = []
+        for word in dict.fromkeys([*self._entries, *other._entries]):
+            count = error = 0
+            registers = None
+            for sketch, floor in zip((self, other), floors):
+                entry = sketch._entries.get(word)
+                if entry is None:
+                    count += floor
+                    error += floor
+                    continue
+                count += entry[0]
+                error += entry[1]
+                registers = entry[2] if registers is None else merge_registers(registers, entry[2])
+            combined.append((count, error, bytearray(registers), word))
+
+        for count, error, registers, word in heapq.nlargest(self.capacity, combined, key=lambda item: item[0]):
+            merged._seen += 1
+            merged._entries[word] = [count, error, registers, merged._seen]
+        # Ties keep the order of the first sketch, then the second
+        merged._heap = [(entry[0], entry[3], word) for word, entry in merged._entries.items()]
+        heapq.heapify(merged._heap)
+        return merged
+
+    def _floor(self):
+        if len(self._entries) < self.capacity:
+            return 0
+        return min(entry[0] for entry in self._entries.values())
+
+    # (term, estimated videos, error bound) of the tracked terms estimated in
+    # at least min_count videos, most frequent first; ties keep the order in
+    # which terms were first tracked
+    #
+    # The estimate is the term's Space-Saving count, checked against the
+    # distinct videos of its registers, see _estimate.
+    def top(self, min_count=2, top_n=None):
+        rows = []
+        for word, (count, error, registers, seen) in self._entries.items():
+            estimate = self._estimate(count, registers)
+            if estimate >= min_count:
+                rows.append((-estimate, seen, word, error))
+        rows.sort()
+        return [(word, -estimate, error) for estimate, _, word, error in rows[:top_n]]
+
+    def to_dict(self):
+        return {
+            'capacity': self.capacity,
+            'precision': self.precision,
+            'total_videos': self.total_videos,
+            'occurrences': self.occurrences,
+            'videos': base64.b64encode(self._videos).decode('ascii'),
+            'terms': [
+                [word, count, error, base64.b64encode(registers).decode('ascii')]
+                for word, (count, error, registers, _) in sorted(self._entries.items(), key=lambda item: item[1][3])
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['capacity'], data['precision'])
+        sketch.total_videos = data['total_videos']
+        sketch.occurrences = data['occurrences']
+        sketch._videos = bytearray(base64.b64decode(data['videos']))
+        for word, count, error, registers in data['terms']:
+            sketch._seen += 1
+            sketch._entries[word] = [count, error, bytearray(base64.b64decode(registers)), sketch._seen]
+        sketch._heap = [(entry[0], entry[3], word) for word, entry in sketch._entries.items()]
+        heapq.heapify(sketch._heap)
+        return sketch
+
+
+# Write sketches keyed by name, e.g. by analyzed field, to a JSON file
+def dump_sketches(path, sketches):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({
+            'version': SKETCH_FORMAT_VERSION,
+            'sketches': {name: sketch.to_dict() for name, sketch in sketches.items()}
+        }, file, ensure_ascii=False)
+
+
+def load_sketches(path):
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    if data.get('version') != SKETCH_FORMAT_VERSION:
+        raise ValueError(f"{path} is not a sketch file of version {SKETCH_FORMAT_VERSION}")
+    return {name: TermSketch.from_dict(sketch) for name, sketch in data['sketches'].items()}
+
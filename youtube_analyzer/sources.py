@@ -0,0 +1,258 @@
+import re
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import parse_qs, urlparse
+
+from youtube_analyzer.cache import DEFAULT_CACHE_PATH, connect
+from youtube_analyzer.client import get_youtube_client
+from youtube_analyzer.quota import QuotaExceeded
+from youtube_analyzer.videos import extract_video_id
+
+# playlistItems.list returns at most 50 items per page
+PLAYLIST_PAGE_SIZE = 50
+
+# Videos taken from each playlist or channel unless configured otherwise
+DEFAULT_MAX_VIDEOS = 200
+
+# Channel paths: /channel/UC..., /@handle, /user/name and /c/name
+CHANNEL_PATH_PATTERN = re.compile(
+    r'^/(?:channel/(?P<channel>UC[0-9A-Za-z_-]{22})'
+    r'|(?P<handle>@[\w.-]+)'
+    r'|user/(?P<username>[\w.-]+)'
+    r'|c/(?P<custom>[\w.-]+))'
+)
+
+# channels.list filter of each kind of channel reference
+CHANNEL_FILTERS = {
+    'channel': 'id',
+    'handle': 'forHandle',
+    'username': 'forUsername'
+}
+
+# Checkpoints not extended for this long are discarded, as their page
+# tokens and listings go stale
+CHECKPOINT_MAX_AGE = 24 * 60 * 60
+
+# One row per listed page of an unfinished listing, keyed by its number in
+# the listing; page_token is the token of the page after it
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlist_pages (
+    playlist_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    page_token TEXT NOT NULL,
+    video_ids TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    PRIMARY KEY (playlist_id, page)
+);
+"""
+
+
+# What a URL points at: ('video', id), ('playlist', id), ('channel', id),
+# ('handle', '@name') or ('username', name); None if it is not a YouTube URL
+def parse_source(url):
+    url = url.strip()
+    # Most inputs are video links, matched by one pattern without parsing
+    # the URL
+    video_id = extract_video_id(url)
+    if video_id:
+        return ('video', video_id)
+
+    if url.startswith('@'):
+        return ('handle', url.split('/')[0])
+
+    parsed = urlparse(url if '://' in url else 'https://' + url)
+    host = parsed.netloc.lower().split(':')[0]
+    if host == 'youtube.com' or host.endswith('.youtube.com'):
+        query = parse_qs(parsed.query)
+        # A watch URL inside a playlist still means that one video
+        if 'list' in query and 'v' not in query:
+            return ('playlist', query['list'][0])
+
+        match = CHANNEL_PATH_PATTERN.match(parsed.path)
+        if match:
+            kind = match.lastgroup
+            # Custom /c/ URLs have no API lookup; most match the channel's handle
+            if kind == 'custom':
+                return ('handle', '@' + match.group(kind))
+            return (kind, match.group(kind))
+    return None
+
+
+# Stripped non-empty lines of pasted or uploaded text, without comments
+def url_lines(text):
+    return [line for line in (line.strip() for line in text.splitlines()) if line and not line.startswith('#')]
+
+
+# Listing progress of playlists, persisted so an interrupted run can resume
+#
+# A checkpoint holds every page listed so far and the token of the next
+# one. Pages are stored by their number, so sessions listing the same
+# playlist at once store each page once. A checkpoint is removed once a
+# listing completes or reaches its cap, so the next run lists the playlist
+# afresh and picks up new uploads, and expires after CHECKPOINT_MAX_AGE.
+class PlaylistCheckpoints:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_age=CHECKPOINT_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(SCHEMA)
+
+    # (number of pages, next page token, listed video IDs) of an unfinished
+    # listing, or None
+    def load(self, playlist_id, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            # Listings nobody extended for max_age are dropped, whole
+            self._conn.execute(
+                "DELETE FROM playlist_pages WHERE playlist_id IN "
+                "(SELECT playlist_id FROM playlist_pages GROUP BY playlist_id HAVING MAX(saved_at) < ?)",
+                (now - self.max_age,)
+            )
+            rows = self._conn.execute(
+                "SELECT page, page_token, video_ids FROM playlist_pages WHERE playlist_id = ? ORDER BY page",
+                (playlist_id,)
+            ).fetchall()
+
+        # Pages are replayed up to the first one missing
+        pages = 0
+        page_token = None
+        video_ids = []
+        for page, token, ids in rows:
+            if page != pages:
+                break
+            pages += 1
+            page_token = token
+            video_ids.extend(ids.split(',') if ids else [])
+        if not pages:
+            return None
+        return pages, page_token, video_ids
+
+    # Record listed page number `page` and the token of the page after it;
+    # a page that is already stored is kept
+    def save(self, playlist_id, page, page_token, video_ids, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO playlist_pages (playlist_id, page, page_token, video_ids, saved_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (playlist_id, page, page_token, ','.join(video_ids), now)
+            )
+
+    def finish(self, playlist_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM playlist_pages WHERE playlist_id = ?", (playlist_id,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM playlist_pages")
+
+
+@lru_cache(maxsize=None)
+def get_playlist_checkpoints(path=DEFAULT_CACHE_PATH):
+    return PlaylistCheckpoints(path)
+
+
+# Uploads playlist of a channel given by ID, handle or legacy username
+def resolve_uploads_playlist(client, scheduler, kind, value):
+    request = client.service.channels().list(part='contentDetails', **{CHANNEL_FILTERS[kind]: value})
+    response = scheduler.execute(client.execute, request, 'channels.list')
+    items = response.get('items', [])
+    if not items:
+        return None
+    return items[0]['contentDetails']['relatedPlaylists']['uploads']
+
+
+# Video IDs of a playlist, one list per page, fetched as they are consumed
+#
+# A saved checkpoint is replayed first and listing continues from its page
+# token, so a resumed run sees the same IDs without paying for those pages.
+def iter_playlist_pages(client, scheduler, playlist_id, checkpoints):
+    page = 0
+    page_token = None
+    checkpoint = checkpoints.load(playlist_id)
+    if checkpoint is not None:
+        page, page_token, video_ids = checkpoint
+        yield video_ids
+
+    while True:
+        request = client.service.playlistItems().list(
+            part='contentDetails',
+            playlistId=playlist_id,
+            maxResults=PLAYLIST_PAGE_SIZE,
+            pageToken=page_token
+        )
+        response = scheduler.execute(client.execute, request, 'playlistItems.list')
+        video_ids = [item['contentDetails']['videoId'] for item in response.get('items', [])]
+
+        page_token = response.get('nextPageToken')
+        if page_token is None:
+            checkpoints.finish(playlist_id)
+            yield video_ids
+            return
+
+        checkpoints.save(playlist_id, page, page_token, video_ids)
+        page += 1
+        yield video_ids
+
+
+# Video IDs of a mix of video, playlist and channel URLs, in input order
+#
+# Playlists and channel uploads are listed page by page only as the caller
+# consumes IDs, so the first batch can be fetched and counted before the
+# last page arrives. Each ID is yielded once, each playlist or channel is
+# listed once and at most max_videos are taken from every one of them
+# (None for all). URLs that can not be parsed go to on_invalid(url), failed
+# listings to on_error(url, message).
+def expand_sources(urls, api_key, scheduler, checkpoints=None, max_videos=DEFAULT_MAX_VIDEOS,
+                   on_invalid=None, on_error=None):
+    from googleapiclient.errors import HttpError
+
+    checkpoints = get_playlist_checkpoints() if checkpoints is None else checkpoints
+    seen = set()
+    listed = set()
+
+    for url in urls:
+        source = parse_source(url)
+        if source is None:
+            if on_invalid is not None:
+                on_invalid(url)
+            continue
+
+        kind, value = source
+        if kind == 'video':
+            if value not in seen:
+                seen.add(value)
+                yield value
+            continue
+        if source in listed:
+            continue
+        listed.add(source)
+
+        try:
+            client = get_youtube_client(api_key)
+            playlist_id = value if kind == 'playlist' else resolve_uploads_playlist(client, scheduler, kind, value)
+            if playlist_id is None:
+                if on_error is not None:
+                    on_error(url, "Channel not found")
+                continue
+
+            remaining = max_videos
+            for page in iter_playlist_pages(client, scheduler, playlist_id, checkpoints):
+                if remaining is not None:
+                    page = page[:remaining]
+                    remaining -= len(page)
+
+                for video_id in page:
+                    if video_id not in seen:
+                        seen.add(video_id)
+                        yield video_id
+
+                # Capped listings are complete as far as this run goes
+                if remaining == 0:
+                    checkpoints.finish(playlist_id)
+                    break
+        except (HttpError, QuotaExceeded, OSError) as e:
+            # The checkpoint is kept, a later run resumes from the last page
+            if on_error is not None:
+                on_error(url, str(e))
@@ -0,0 +1,267 @@
+from collections.abc import Sequence
+
+# Format of published_at in video dicts, as the API returns it
+PUBLISHED_FORMAT_SUFFIX = 'Z'
+
+# Text columns, stored as one UTF-8 buffer each
+TEXT_COLUMNS = ('title', 'description', 'thumbnail')
+
+
+# Strings packed into one UTF-8 buffer with int64 offsets, the layout of an
+# Arrow large_string array, so Parquet columns load without a copy per row
+class StringColumn:
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings):
+        import numpy as np
+
+        encoded = [string.encode('utf-8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        return cls(offsets, b''.join(encoded))
+
+    # Column of an Arrow string array; nulls read as empty strings
+    @classmethod
+    def from_arrow(cls, array):
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        array = pc.fill_null(array.cast(pa.large_string()), '')
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        _, offsets, data = array.buffers()
+        offsets = np.frombuffer(offsets, dtype=np.int64, count=len(array) + 1, offset=array.offset * 8)
+        return cls(offsets, memoryview(data) if data is not None else b'')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        return str(self.data[self.offsets[position]:self.offsets[position + 1]], 'utf-8')
+
+    def to_arrow(self):
+        import pyarrow as pa
+
+        return pa.Array.from_buffers(
+            pa.large_string(), len(self),
+            [None, pa.py_buffer(self.offsets), pa.py_buffer(self.data)]
+        )
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + len(self.data)
+
+
+# Tag lists as IDs into one list of distinct tags, CSR-style: the tags of
+# video p are vocabulary[indices[indptr[p]:indptr[p + 1]]]
+class TagColumn:
+    def __init__(self, vocabulary, indptr, indices):
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_lists(cls, tag_lists):
+        import numpy as np
+
+        tag_ids = {}
+        indices = []
+        indptr = [0]
+        for tags in tag_lists:
+            indices.extend(tag_ids.setdefault(tag, len(tag_ids)) for tag in tags)
+            indptr.append(len(indices))
+        return cls(list(tag_ids), np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int32))
+
+    @classmethod
+    def from_arrow(cls, array):
+        import numpy as np
+        import pyarrow as pa
+
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        array = array.cast(pa.large_list(pa.string()))
+        # Null lists have no tags
+        indptr = array.offsets.to_numpy(zero_copy_only=False).astype(np.int64)
+        indptr -= indptr[0]
+        encoded = array.flatten().dictionary_encode()
+        return cls(
+            encoded.dictionary.to_pylist(),
+            indptr,
+            encoded.indices.to_numpy(zero_copy_only=False).astype(np.int32)
+        )
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, position):
+        vocabulary = self.vocabulary
+        return [vocabulary[tag_id] for tag_id in self.indices[self.indptr[position]:self.indptr[position + 1]]]
+
+    def to_arrow(self):
+        import pyarrow as pa
+
+        values = pa.array(self.vocabulary, pa.string()).take(pa.array(self.indices))
+        return pa.LargeListArray.from_arrays(pa.array(self.indptr), values)
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + sum(len(tag) + 49 for tag in self.vocabulary)
+
+
+def parse_published(value):
+    import numpy as np
+
+    if not value:
+        return np.datetime64('NaT', 's')
+    try:
+        return np.datetime64(value.rstrip(PUBLISHED_FORMAT_SUFFIX), 's')
+    except ValueError:
+        return np.datetime64('NaT', 's')
+
+
+# Videos in a compact columnar table, read as a sequence of video dicts
+#
+# Titles, descriptions and thumbnail URLs are packed in UTF-8 buffers, tags
+# are interned, view counts are int64 and publish times datetime64[s]
+# columns, so a video costs a few bytes more than its text instead of a dict
+# of Python objects. store[position] builds the dict of one video on demand
+# (a slice builds a list of them), in the shape get_video_details returns,
+# and video_positions finds a video by ID in O(1).
+#
+# The store is immutable; from_videos builds a new one, e.g. after an
+# analysis adds videos. save_parquet and load_parquet keep snapshots; the
+# videos.parquet table of the command line tool loads as well.
+class VideoStore(Sequence):
+    def __init__(self, video_ids, columns, tags, view_counts, published):
+        self.video_ids = video_ids
+        self.video_positions = {video_id: position for position, video_id in enumerate(video_ids)}
+        self.columns = columns
+        self.tags = tags
+        self.view_counts = view_counts
+        self.published = published
+
+    @classmethod
+    def from_videos(cls, videos):
+        import numpy as np
+
+        videos = list(videos)
+        return cls(
+            [video['id'] for video in videos],
+            {key: StringColumn.from_strings(video.get(key, '') for video in videos) for key in TEXT_COLUMNS},
+            TagColumn.from_lists(video.get('tags', []) for video in videos),
+            np.array([video.get('view_count', 0) for video in videos], dtype=np.int64),
+            np.array([parse_published(video.get('published_at', '')) for video in videos], dtype='datetime64[s]')
+        )
+
+    def __len__(self):
+        return len(self.video_ids)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._video(i) for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("video position out of range")
+        return self._video(position)
+
+    def _video(self, position):
+        import numpy as np
+
+        published = self.published[position]
+        columns = self.columns
+        return {
+            'id': self.video_ids[position],
+            'title': columns['title'][position],
+            'description': columns['description'][position],
+            'tags': self.tags[position],
+            'thumbnail': columns['thumbnail'][position],
+            'view_count': int(self.view_counts[position]),
+            'published_at': '' if np.isnat(published) else f"{published}{PUBLISHED_FORMAT_SUFFIX}"
+        }
+
+    # Video dict of an ID, or default if the store does not have it
+    def get(self, video_id, default=None):
+        position = self.video_positions.get(video_id)
+        return default if position is None else self._video(position)
+
+    # One text column of every video, without building their dicts
+    def texts(self, key):
+        column = self.columns[key]
+        return [column[position] for position in range(len(self))]
+
+    # Bytes held by the columns, not counting the ID strings and their index
+    @property
+    def nbytes(self):
+        return (
+            sum(column.nbytes for column in self.columns.values())
+            + self.tags.nbytes + self.view_counts.nbytes + self.published.nbytes
+        )
+
+    def to_arrow(self):
+        import pyarrow as pa
+
+        return pa.table({
+            'id': pa.array(self.video_ids, pa.string()),
+            'title': self.columns['title'].to_arrow(),
+            'description': self.columns['description'].to_arrow(),
+            'tags': self.tags.to_arrow(),
+            'thumbnail': self.columns['thumbnail'].to_arrow(),
+            'view_count': pa.array(self.view_counts),
+            'published_at': pa.array(self.published, pa.timestamp('s', tz='UTC'))
+        })
+
+    @classmethod
+    def from_arrow(cls, table):
+        import numpy as np
+        import pyarrow as pa
+
+        names = set(table.column_names)
+        count = table.num_rows
+
+        def text(key):
+            if key in names:
+                return StringColumn.from_arrow(table[key])
+            return StringColumn(np.zeros(count + 1, dtype=np.int64), b'')
+
+        if 'tags' in names:
+            tags = TagColumn.from_arrow(table['tags'])
+        else:
+            tags = TagColumn([], np.zeros(count + 1, dtype=np.int64), np.zeros(0, dtype=np.int32))
+
+        if 'view_count' in names:
+            view_counts = table['view_count'].fill_null(0).to_numpy().astype(np.int64)
+        else:
+            view_counts = np.zeros(count, dtype=np.int64)
+
+        if 'published_at' not in names:
+            published = np.full(count, np.datetime64('NaT', 's'))
+        elif pa.types.is_timestamp(table['published_at'].type):
+            published = table['published_at'].cast(pa.timestamp('s')).to_numpy().astype('datetime64[s]')
+        else:
+            # Strings as the API returns them, e.g. the command line output
+            published = np.array(
+                [parse_published(value) for value in table['published_at'].to_pylist()], dtype='datetime64[s]'
+            )
+
+        return cls(
+            table['id'].to_pylist(),
+            {key: text(key) for key in TEXT_COLUMNS},
+            tags, view_counts, published
+        )
+
+    # Write the store to a Parquet file or file-like target
+    def save_parquet(self, target):
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), target)
+
+    @classmethod
+    def load_parquet(cls, source):
+        import pyarrow.parquet as pq
+
+        return cls.from_arrow(pq.read_table(source))
@@ -0,0 +1,198 @@
+import re
+
+from youtube_analyzer.diagnostics import stage
+from youtube_analyzer.memo import LRUCache, text_digest
+
+# Comprehensive URL pattern; URLs are removed whole instead of split into words
+URL_PATTERN = r'(https?:\/\/)?(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)'
+
+# Whitespace-delimited runs containing a dot, the only places a URL can match
+DOTTED_RUN_PATTERN = r'[^\s.]*\.\S*'
+
+# Words including hyphenated terms
+WORD_PATTERN = r'\b[\w\-]+\b'
+
+# Punctuation, brackets, line breaks and free-standing dashes end a phrase
+SEGMENT_PATTERN = r'[.!?;:,|()\[\]{}"\u201c\u201d\n\r\u2022\u00b7\u2013\u2014]+|\s-+\s'
+
+# Word normalization for hyphenated/non-hyphenated variants
+DEFAULT_WORD_VARIANTS = {
+    'lo-fi': 'lofi',
+    'lo fi': 'lofi',
+    'hip-hop': 'hiphop',
+    'hip hop': 'hiphop',
+    'r&b': 'rnb',
+    'r & b': 'rnb'
+}
+
+# Common multi-word phrases to preserve as single tokens
+DEFAULT_PHRASES = (
+    "hiphop", "lofi beats", "chill mix", "study music",
+    "relaxing music", "sleep music", "ambient music",
+    "background music", "piano music", "jazz music",
+    "lofi chill", "chill out", "deep house"
+)
+
+# Common stop words to filter out
+DEFAULT_STOP_WORDS = frozenset({
+    'a', 'an', 'the', 'and', 'or', 'but', 'if', 'because', 'as', 'what',
+    'when', 'where', 'how', 'why', 'which', 'who', 'whom', 'this', 'that',
+    'these', 'those', 'in', 'on', 'at', 'by', 'for', 'with', 'about',
+    'against', 'between', 'into', 'through', 'during', 'before', 'after',
+    'above', 'below', 'to', 'from', 'up', 'down', 'is', 'am', 'are',
+    'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having',
+    'do', 'does', 'did', 'doing', 'i', 'you', 'he', 'she', 'it', 'we', 'they',
+    'me', 'him', 'her', 'us', 'them', 'my', 'your', 'his', 'its', 'our', 'their',
+    'can', 'could', 'will', 'would', 'shall', 'should', 'may', 'might', 'must'
+})
+
+# Words shorter than this are dropped
+MIN_WORD_LENGTH = 3
+
+
+# Build an alternation that tries longer alternatives first
+def _alternation(strings):
+    return '|'.join(re.escape(s) for s in sorted(strings, key=lambda s: (-len(s), s)))
+
+
+# Reusable tokenizer with all patterns compiled once
+#
+# Variant normalization and phrase joining run as one alternation regex over
+# the raw lowercased text. A phrase "w1 ... wn" is matched as its head
+# "w1 ... wn-1 " followed by a lookahead for wn, and the head's spaces become
+# underscores, so chains such as "lofi chill mix" join the same way the
+# former sequential str.replace passes did. Phrase alternatives are expanded
+# with every raw spelling of the variants (and with variants whose normalized
+# form runs into the phrase, as in "hip hopiano music"), so matching the raw
+# text gives the same result as normalizing it first.
+class Tokenizer:
+    def __init__(self, word_variants=None, phrases=None, stop_words=None, min_length=MIN_WORD_LENGTH):
+        self.word_variants = {
+            variant.lower(): normalized.lower()
+            for variant, normalized in (DEFAULT_WORD_VARIANTS if word_variants is None else word_variants).items()
+        }
+        self.phrases = tuple(p.lower() for p in (DEFAULT_PHRASES if phrases is None else phrases))
+        self.stop_words = frozenset(DEFAULT_STOP_WORDS if stop_words is None else stop_words)
+        self.min_length = min_length
+
+        self._url_re = re.compile(URL_PATTERN, re.IGNORECASE)
+        self._dotted_run_re = re.compile(DOTTED_RUN_PATTERN)
+        self._word_re = re.compile(WORD_PATTERN)
+        self._segment_re = re.compile(SEGMENT_PATTERN)
+        self._variant_re = re.compile(_alternation(self.word_variants)) if self.word_variants else None
+
+        phrase_alternatives = self._phrase_alternatives()
+        self._has_phrases = bool(phrase_alternatives)
+        parts = []
+        if phrase_alternatives:
+            parts.append(f"(?P<phrase>{'|'.join(phrase_alternatives)})")
+        if self.word_variants:
+            parts.append(_alternation(self.word_variants))
+        self._normalize_re = re.compile('|'.join(parts)) if parts else None
+
+    # Every raw spelling that normalizes to `text`
+    def _raw_forms(self, text):
+        forms = {text}
+        for variant, normalized in self.word_variants.items():
+            for form in list(forms):
+                if normalized in form:
+                    forms.add(form.replace(normalized, variant))
+        return forms
+
+    def _phrase_alternatives(self):
+        alternatives = []
+        for phrase in self.phrases:
+            words = phrase.split(' ')
+            # Single-word phrases are already single tokens
+            if len(words) < 2:
+                continue
+
+            head = ' '.join(words[:-1]) + ' '
+            lookahead = f"(?={_alternation(self._raw_forms(words[-1]))})"
+            heads = {re.escape(form) for form in self._raw_forms(head)}
+
+            # A variant whose normalized form ends with the start of the
+            # phrase, e.g. "hip hop" + "iano music" -> "hiphopiano music"
+            for variant, normalized in self.word_variants.items():
+                for overlap in range(1, min(len(normalized), len(head))):
+                    if normalized[-overlap:] == head[:overlap]:
+                        for rest in self._raw_forms(head[overlap:]):
+                            heads.add(re.escape(variant + rest))
+
+            alternatives.extend(f"{h}{lookahead}" for h in heads)
+
+        # Longest heads first, so the most specific alternative wins
+        return sorted(alternatives, key=lambda a: (-len(a), a))
+
+    # Remove URLs completely
+    #
+    # A URL match never spans whitespace and always contains a dot, so the
+    # expensive URL pattern only has to run on the dotted runs of the text.
+    def _strip_urls(self, text):
+        if '.' not in text:
+            return text
+        return self._dotted_run_re.sub(lambda m: self._url_re.sub(' ', m.group()), text)
+
+    def _normalize_variants(self, text):
+        if self._variant_re is None:
+            return text
+        return self._variant_re.sub(lambda m: self.word_variants[m.group()], text)
+
+    def _replace(self, match):
+        normalized = self._normalize_variants(match.group())
+        if self._has_phrases and match.group('phrase') is not None:
+            return normalized.replace(' ', '_')
+        return normalized
+
+    # Tokenize text and remove common stop words
+    def tokenize(self, text):
+        text = self._strip_urls(text).lower()
+        if self._normalize_re is not None:
+            text = self._normalize_re.sub(self._replace, text)
+
+        stop_words = self.stop_words
+        min_length = self.min_length
+        # Hyphens are removed to normalize hyphenated words, underscores mark
+        # joined phrases
+        return [
+            word.replace('_', ' ') if '_' in word else word
+            for word in (w.replace('-', '') for w in self._word_re.findall(text))
+            if word not in stop_words and len(word) >= min_length
+        ]
+
+    # Runs of words that can form a phrase, for n-gram mining
+    #
+    # URLs are removed and variants normalized as in tokenize, but stop words
+    # and short words are kept, so "rain sounds for sleeping" stays one run,
+    # and the fixed phrases are not joined. Runs end at punctuation and
+    # line breaks.
+    def segments(self, text):
+        text = self._normalize_variants(self._strip_urls(text).lower())
+        return [
+            [word.replace('-', '') for word in self._word_re.findall(part)]
+            for part in self._segment_re.split(text)
+        ]
+
+    __call__ = tokenize
+
+
+DEFAULT_TOKENIZER = Tokenizer()
+
+# Tokens of recently seen texts, keyed by a hash of the text and bounded by
+# the total number of tokens held
+TOKEN_CACHE_SIZE = 1_000_000
+TOKEN_CACHE = LRUCache('tokenize', TOKEN_CACHE_SIZE, weight=lambda tokens: len(tokens) + 1)
+
+
+# Function to tokenize text with the default vocabulary
+#
+# The same titles and descriptions are tokenized again whenever a set of
+# videos is re-analyzed, so results are reused across analyses and sessions.
+def tokenize_text(text):
+    key = text_digest(text)
+    tokens = TOKEN_CACHE.get(key)
+    if tokens is None:
+        with stage('tokenize_text'):
+            tokens = TOKEN_CACHE.put(key, tuple(DEFAULT_TOKENIZER.tokenize(text)))
+    # Callers get their own list, the cached tuple is shared
+    return list(tokens)
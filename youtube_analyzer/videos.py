@@ -0,0 +1,156 @@
+import re
+from itertools import islice
+
+from youtube_analyzer.cache import get_video_cache, request_key
+from youtube_analyzer.client import get_youtube_client
+from youtube_analyzer.diagnostics import count, timed
+from youtube_analyzer.quota import QuotaExceeded, QuotaScheduler
+
+
+# Video URLs in one pattern: watch?v=, youtu.be/, /embed/, /shorts/, /live/
+# and /v/ links on YouTube hosts. The ID must end where the path or
+# parameter does, so /feed/subscriptions or a longer path segment is not
+# taken for a video.
+VIDEO_URL_PATTERN = re.compile(
+    r'\s*(?i:(?:https?://)?(?:[\w-]+\.)*(?:youtu\.be/|youtube(?:-nocookie)?\.com/'
+    r'(?:(?:embed|shorts|live|v|e)/|watch/?\?(?:[^#\s]*&)?v=)))'
+    r'(?!videoseries)(?P<id>[0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])'
+)
+
+# Video ID of a YouTube URL, or None
+def extract_video_id(url):
+    match = VIDEO_URL_PATTERN.match(url)
+    if match is None:
+        return None
+    return match.group('id')
+
+# videos.list accepts at most 50 comma-separated IDs per call
+MAX_IDS_PER_REQUEST = 50
+
+# Extract relevant information from a videos.list item
+def parse_video_item(video_item):
+    snippet = video_item['snippet']
+    statistics = video_item.get('statistics', {})
+
+    return {
+        'id': video_item['id'],
+        'title': snippet.get('title', ''),
+        'description': snippet.get('description', ''),
+        'tags': snippet.get('tags', []),
+        'thumbnail': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
+        'view_count': int(statistics.get('viewCount', 0)),
+        'published_at': snippet.get('publishedAt', '')
+    }
+
+# Video IDs passed to one get_video_details call when IDs are streamed
+DEFAULT_BATCH_SIZE = 500
+
+# Lists of up to `size` items drawn lazily from any iterable
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+# Split a list of video IDs into chunks of at most `size` IDs
+def chunk_ids(video_ids, size=MAX_IDS_PER_REQUEST):
+    return [video_ids[i:i + size] for i in range(0, len(video_ids), size)]
+
+# Refresh the volatile fields of a cached video from a statistics-only item
+def merge_statistics(video, video_item):
+    statistics = video_item.get('statistics', {})
+    return dict(video, view_count=int(statistics.get('viewCount', 0)))
+
+# Function to get video details from YouTube API
+#
+# client defaults to the shared client of api_key; anything with the same
+# service, execute and submit_all interface can stand in for it.
+@timed('get_video_details')
+def get_video_details(api_key, video_ids, cache=None, scheduler=None, client=None):
+    from googleapiclient.errors import HttpError
+
+    cache = get_video_cache() if cache is None else cache
+    scheduler = QuotaScheduler() if scheduler is None else scheduler
+
+    # Drop duplicate IDs but keep the order they were entered in
+    unique_ids = list(dict.fromkeys(video_ids))
+
+    # Fresh cache entries are served as-is; stale ones are refetched, with
+    # only the statistics part requested when just the view count expired
+    fetched, stale_stats, stale_static = cache.lookup(unique_ids)
+    count('video_cache_hits', len(fetched))
+    count('video_cache_misses', len(stale_stats) + len(stale_static))
+    jobs = (
+        [('snippet,statistics', chunk) for chunk in chunk_ids(stale_static)]
+        + [('statistics', chunk) for chunk in chunk_ids(stale_stats)]
+    )
+    failed_ids = []
+    errors = []
+
+    if jobs:
+        client = get_youtube_client(api_key) if client is None else client
+        cached = cache.get_many(stale_stats + stale_static)
+
+        # Requests are built up front; only their execution runs in the pool
+        requests = []
+        for part, chunk in jobs:
+            request = client.service.videos().list(part=part, id=','.join(chunk))
+
+            # Revalidate with the ETag of the identical earlier request, so an
+            # unchanged chunk comes back as an empty 304 response
+            etag = cache.get_etag(request_key(part, chunk))
+            if etag and all(video_id in cached for video_id in chunk):
+                request.headers['If-None-Match'] = etag
+
+            requests.append(request)
+
+        # Chunks run concurrently on the client's worker pool, one
+        # videos.list call per chunk, within the scheduler's quota budget
+        futures = client.submit_all(requests, scheduler)
+
+        for (part, chunk), future in zip(jobs, futures):
+            static = part != 'statistics'
+
+            try:
+                video_response = future.result()
+            except HttpError as e:
+                if e.resp.status == 304:
+                    count('api_not_modified')
+                    cache.touch(chunk, static=static)
+                    fetched.update({video_id: cached[video_id] for video_id in chunk})
+                else:
+                    errors.append(f"An error occurred: {e}")
+                    failed_ids.extend(chunk)
+                continue
+            except QuotaExceeded as e:
+                # Keep what was fetched so far; the rest is reported as failed
+                errors.append(str(e))
+                failed_ids.extend(chunk)
+                continue
+
+            items = video_response.get('items', [])
+            if static:
+                videos = [parse_video_item(item) for item in items]
+            else:
+                videos = [merge_statistics(cached[item['id']], item) for item in items if item['id'] in cached]
+
+            cache.store(videos, static=static)
+            if 'etag' in video_response:
+                cache.set_etag(request_key(part, chunk), video_response['etag'])
+            fetched.update({video['id']: video for video in videos})
+
+    # Return videos in input order; IDs the API did not return are missing,
+    # private or deleted videos
+    videos_data = [fetched[video_id] for video_id in unique_ids if video_id in fetched]
+    failed = set(failed_ids)
+    missing_ids = [
+        video_id for video_id in unique_ids
+        if video_id not in fetched and video_id not in failed
+    ]
+
+    return {
+        'videos': videos_data,
+        'missing_ids': missing_ids,
+        'failed_ids': [video_id for video_id in unique_ids if video_id in failed],
+        # Distinct messages only, a budget cut-off fails every remaining chunk
+        'errors': list(dict.fromkeys(errors))
+    }